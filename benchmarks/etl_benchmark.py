@@ -0,0 +1,253 @@
+"""Offline throughput benchmarks for the ETL.
+
+Pages are served by a local fixtures.py server: recorded pages where they
+exist (record them with `python src/fixtures.py record`) and synthetic
+basketball-reference pages for every other team season, so workloads can
+be scaled without touching the live site.
+
+    python benchmarks/etl_benchmark.py --teams LAL --seasons 2024
+    python benchmarks/etl_benchmark.py --teams all --seasons 2005-2024 --output bench.json
+    python benchmarks/etl_benchmark.py --teams all --seasons 2005-2024 \\
+        --postgres-url postgresql://localhost/nba_bench --baseline bench.json
+
+Each phase reports its throughput, and the peak and retained Python heap
+of one extra run traced with tracemalloc, which measures the phase alone
+and keeps the tracing overhead out of the timed runs.
+With --baseline, throughputs that dropped by more than --tolerance fail
+the run, so it can gate changes in CI.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from backfill import parse_seasons
+from database import DatabaseManager
+from etl import LakersDataPipeline, parse_targets
+from fixtures import FixtureServer, FixtureStore
+from metrics import RunMetrics
+from models import Base
+from scraper import LakersDataScraper
+
+logger = logging.getLogger('etl_benchmark')
+
+# Result keys compared against a baseline, higher is better
+THROUGHPUT_KEYS = ['pages_per_second', 'rows_per_second']
+
+def traced_memory(func: Callable[[], Dict]) -> Dict:
+    """Run func once under tracemalloc and return the memory it allocated at peak and kept, in MB"""
+    # Only allocations made while tracing are counted, so earlier phases do not show up
+    tracemalloc.start()
+    try:
+        func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'peak_memory_mb': peak / 1e6, 'retained_memory_mb': retained / 1e6}
+
+def bench_fetch(scraper: LakersDataScraper, targets: List[Tuple[str, int]], workers: int) -> Dict:
+    """Download every page into the scraper's page cache"""
+    scraper.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        sizes = list(executor.map(lambda target: len(scraper.pages.fetch(scraper.team_url(*target))), targets))
+    elapsed = time.perf_counter() - start
+    return {
+        'pages': len(targets),
+        'seconds': elapsed,
+        'pages_per_second': len(targets) / elapsed,
+        'megabytes_per_second': sum(sizes) / elapsed / 1e6
+    }
+
+def bench_parse(scraper: LakersDataScraper, targets: List[Tuple[str, int]]) -> Tuple[Dict, List[Dict]]:
+    """Parse the fetched pages and extract their team, roster and stats records"""
+    start = time.perf_counter()
+    records = []
+    for team_id, season in targets:
+        scraper.pages.parse(scraper.team_url(team_id, season))
+        records.append(scraper.scrape_target(team_id, season))
+    elapsed = time.perf_counter() - start
+    rows = sum(len(record['roster']) + len(record['stats']) for record in records)
+    return {
+        'pages': len(targets),
+        'rows': rows,
+        'seconds': elapsed,
+        'pages_per_second': len(targets) / elapsed,
+        'rows_per_second': rows / elapsed
+    }, records
+
+def fresh_database(url: str) -> DatabaseManager:
+    db = DatabaseManager(url, metrics=RunMetrics())
+    Base.metadata.drop_all(db.engine)
+    db.engine.dispose()
+    return DatabaseManager(url, metrics=RunMetrics())
+
+def bench_load(url: str, records: List[Dict]) -> Dict:
+    """Write every target's records into an empty database, then derive metrics"""
+    db = fresh_database(url)
+    start = time.perf_counter()
+    for record in records:
+        if not db.load_target(record['team'], record['roster'], record['stats']):
+            raise RuntimeError("load failed, see the log")
+    load_seconds = time.perf_counter() - start
+    derive_start = time.perf_counter()
+    db.refresh_derived_metrics()
+    derive_seconds = time.perf_counter() - derive_start
+    db.engine.dispose()
+    rows = sum(db.metrics.report()['counters'].get('rows_written', {}).values())
+    return {
+        'targets': len(records),
+        'rows': rows,
+        'seconds': load_seconds,
+        'derive_seconds': derive_seconds,
+        'pages_per_second': len(records) / load_seconds,
+        'rows_per_second': rows / load_seconds
+    }
+
+def bench_pipeline(url: str, base_url: str, targets: List[Tuple[str, int]], workers: int,
+                   workdir: str) -> Dict:
+    """Run the whole staged pipeline end to end against an empty database and page archive"""
+    fresh_database(url).engine.dispose()
+    os.environ['DATABASE_URL'] = url
+    os.environ['SCRAPER_BASE_URL'] = base_url
+    # A fresh archive per run, so later runs do not revalidate into 304s read from the last one
+    pipeline = LakersDataPipeline(targets, max_workers=workers,
+                                  snapshot_dir=os.path.join(workdir, 'snapshots'),
+                                  index_dir=os.path.join(workdir, 'indexes'),
+                                  archive_dir=tempfile.mkdtemp(prefix='archive-', dir=workdir))
+    start = time.perf_counter()
+    pipeline.run()
+    elapsed = time.perf_counter() - start
+    pipeline.close()
+    pipeline.db.engine.dispose()
+    report = pipeline.metrics.report()
+    if pipeline.failures:
+        raise RuntimeError(f"{len(pipeline.failures)} targets failed, see the log")
+    return {
+        'targets': len(targets),
+        'seconds': elapsed,
+        'pages_per_second': len(targets) / elapsed,
+        'stages': {stage: timing['total_seconds'] for stage, timing in report['stages'].items()}
+    }
+
+def run_phase(name: str, repeat: int, func: Callable[[], Dict]) -> Dict:
+    """Run a phase repeat times and keep the run with the median wall time, then once more for its memory"""
+    results = sorted((func() for _ in range(repeat)), key=lambda result: result['seconds'])
+    result = dict(results[(len(results) - 1) // 2], **traced_memory(func), runs=repeat)
+    logger.info(f"{name}: " + ', '.join(
+        f"{key} {value:.1f}" for key, value in result.items() if isinstance(value, float)
+    ))
+    return result
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """List the throughputs that dropped more than tolerance below the baseline"""
+    regressions = []
+    for phase, result in results.items():
+        for key in THROUGHPUT_KEYS:
+            before = baseline.get(phase, {}).get(key)
+            after = result.get(key)
+            if before and after is not None and after < before * (1 - tolerance):
+                regressions.append(f"{phase} {key}: {after:.1f} vs baseline {before:.1f} "
+                                   f"({after / before - 1:+.0%})")
+    return regressions
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Offline ETL throughput benchmark")
+    parser.add_argument('--teams', nargs='+', default=['LAL'], help="team abbreviations, or 'all'")
+    parser.add_argument('--seasons', nargs='+', default=['2024'], help="season end years or ranges like 2005-2024")
+    parser.add_argument('--fixtures', default=None, help="recorded fixture directory (default FIXTURE_DIR or fixtures/)")
+    parser.add_argument('--workers', type=int, default=8, help="concurrent fetches")
+    parser.add_argument('--delay-ms', type=float, default=0, help="latency the fixture server adds to each page")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per phase, the median is reported")
+    parser.add_argument('--postgres-url', default=os.getenv('BENCH_POSTGRES_URL'),
+                        help="also benchmark loads into this PostgreSQL database (its tables are dropped)")
+    parser.add_argument('--skip-pipeline', action='store_true', help="skip the end-to-end pipeline run")
+    parser.add_argument('--output', default=None, help="write results as JSON")
+    parser.add_argument('--baseline', default=None, help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed throughput drop against the baseline")
+    args = parser.parse_args()
+    # Per-target ETL logging would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    targets = parse_targets(args.teams, parse_seasons(args.seasons))
+    store = FixtureStore(args.fixtures)
+    recorded = sum(os.path.exists(store.path(f"/teams/{team_id}/{season}.html")) for team_id, season in targets)
+    server = FixtureServer(store, delay_ms=args.delay_ms)
+    server.start()
+    logger.info(f"Benchmarking {len(targets)} team seasons ({recorded} recorded, "
+                f"{len(targets) - recorded} synthetic) from {server.base_url}")
+
+    workdir = tempfile.mkdtemp(prefix='etl-bench-')
+    backends = {'sqlite': f"sqlite:///{os.path.join(workdir, 'bench.db')}"}
+    if args.postgres_url:
+        backends['postgresql'] = args.postgres_url
+    try:
+        scraper = LakersDataScraper(pool_size=args.workers, base_url=server.base_url)
+        results = {}
+        results['fetch'] = run_phase(
+            'fetch', args.repeat, lambda: bench_fetch(scraper, targets, args.workers)
+        )
+        
+        parsed = {}
+        def parse():
+            bench_fetch(scraper, targets, args.workers)
+            result, parsed['records'] = bench_parse(scraper, targets)
+            return result
+        results['parse'] = run_phase('parse', args.repeat, parse)
+        
+        for backend, url in backends.items():
+            results[f"load_{backend}"] = run_phase(
+                f"load {backend}", args.repeat, lambda: bench_load(url, parsed['records'])
+            )
+        parsed.clear()
+        
+        if not args.skip_pipeline:
+            for backend, url in backends.items():
+                results[f"pipeline_{backend}"] = run_phase(
+                    f"pipeline {backend}", args.repeat,
+                    lambda: bench_pipeline(url, server.base_url, targets, args.workers, workdir)
+                )
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = {
+        'config': {
+            'targets': len(targets),
+            'recorded_pages': recorded,
+            'workers': args.workers,
+            'delay_ms': args.delay_ms,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+        logger.info(f"Wrote results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        logger.info("No regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
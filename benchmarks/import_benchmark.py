@@ -0,0 +1,151 @@
+"""Cold-start benchmarks for the ETL and the dashboard.
+
+Every measurement runs in a fresh interpreter, so it sees what a container
+restart sees: the time to import each entry point, and the time for the
+dashboard to render its first page and each of its views.
+
+    python benchmarks/import_benchmark.py
+    python benchmarks/import_benchmark.py --output imports.json
+    python benchmarks/import_benchmark.py --baseline imports.json --repeat 7
+
+Each result also lists which heavy dependencies the entry point loaded, so
+an eager import sneaking back in shows up even when the timings are noisy.
+With --baseline, timings that grew by more than --tolerance fail the run.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger('import_benchmark')
+
+# Entry points timed by importing them: name -> (directory, module)
+MODULES = {
+    'etl': ('src', 'etl'),
+    'scraper': ('src', 'scraper'),
+    'fixtures': ('src', 'fixtures'),
+    'data_loader': ('streamlit_app', 'data_loader'),
+    'scoring': ('streamlit_app', 'scoring')
+}
+
+VIEWS = ['Team Overview', 'Player Stats', 'Similar Players', 'Points Predictor']
+
+# Dependencies whose import cost is worth tracking
+HEAVY_MODULES = ['pandas', 'numpy', 'pyarrow', 'sqlalchemy', 'lxml', 'plotly.express', 'plotly.graph_objects',
+                 'sklearn', 'streamlit']
+
+IMPORT_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {directory!r})
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+VIEW_SCRIPT = """
+import json, os, sys, time
+os.chdir({directory!r})
+sys.path.insert(0, {directory!r})
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file('app.py', default_timeout=300)
+app.run()
+if {view!r} != {first!r}:
+    app.sidebar.radio[0].set_value({view!r}).run()
+seconds = time.perf_counter() - start
+errors = [str(e.value) for e in app.exception]
+print(json.dumps({{'seconds': seconds, 'errors': errors,
+                   'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def run_fresh(script: str) -> Dict:
+    """Run a measurement script in a new interpreter and return its JSON result"""
+    completed = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, cwd=ROOT)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else 'failed')
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def measure(name: str, script: str, repeat: int) -> Dict:
+    """Run script repeat times and report the median wall time"""
+    runs = [run_fresh(script) for _ in range(repeat)]
+    result = {
+        'seconds': statistics.median(run['seconds'] for run in runs),
+        'min_seconds': min(run['seconds'] for run in runs),
+        'loaded': runs[-1]['loaded'],
+        'runs': repeat
+    }
+    if runs[-1].get('errors'):
+        result['errors'] = runs[-1]['errors']
+        logger.error(f"{name} raised: {'; '.join(result['errors'])}")
+    logger.info(f"{name}: {result['seconds'] * 1000:.0f}ms (loaded {', '.join(result['loaded']) or 'nothing heavy'})")
+    return result
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """List the timings that grew more than tolerance above the baseline"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name, {}).get('seconds')
+        after = result['seconds']
+        if before and after > before * (1 + tolerance):
+            regressions.append(f"{name}: {after * 1000:.0f}ms vs baseline {before * 1000:.0f}ms "
+                               f"({after / before - 1:+.0%})")
+    return regressions
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Cold-start import and first page view benchmark")
+    parser.add_argument('--modules', nargs='+', default=list(MODULES), choices=list(MODULES),
+                        help="entry points to import")
+    parser.add_argument('--skip-views', action='store_true', help="skip the dashboard page view timings")
+    parser.add_argument('--repeat', type=int, default=5, help="fresh interpreters per measurement, the median is reported")
+    parser.add_argument('--output', default=None, help="write results as JSON")
+    parser.add_argument('--baseline', default=None, help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.modules:
+        directory, module = MODULES[name]
+        script = IMPORT_SCRIPT.format(directory=os.path.join(ROOT, directory), module=module,
+                                      heavy=HEAVY_MODULES)
+        results[f"import_{name}"] = measure(f"import {name}", script, args.repeat)
+
+    if not args.skip_views:
+        for view in VIEWS:
+            script = VIEW_SCRIPT.format(directory=os.path.join(ROOT, 'streamlit_app'), view=view,
+                                        first=VIEWS[0], heavy=HEAVY_MODULES)
+            name = view.lower().replace(' ', '_')
+            results[f"view_{name}"] = measure(f"view {view}", script, args.repeat)
+
+    output = {
+        'config': {
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+        logger.info(f"Wrote results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        logger.info("No regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
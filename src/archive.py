@@ -0,0 +1,150 @@
+import argparse
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from atomic import write_atomic
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'archive')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fetches (
+    url TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS fetches_url ON fetches (url, fetched_at);
+"""
+
+def archive_root(directory: str = None) -> str:
+    return directory or os.getenv('PAGE_ARCHIVE_DIR', DEFAULT_ARCHIVE_DIR)
+
+class PageArchive:
+    """
+    Every fetched page body, gzipped and stored once per distinct content
+    under objects/<hash[:2]>/<sha256>.html.gz. An SQLite index next to the
+    objects records each fetch by URL and time with the validators the
+    server sent, so pages can be revalidated and re-parsed later without
+    downloading them again.
+    """
+
+    def __init__(self, directory: str = None, compress_level: int = None):
+        self.directory = archive_root(directory)
+        self.compress_level = compress_level or int(os.getenv('PAGE_ARCHIVE_COMPRESS_LEVEL', '6'))
+        os.makedirs(os.path.join(self.directory, 'objects'), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(self.directory, 'index.db'), timeout=30,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def object_path(self, content_hash: str) -> str:
+        return os.path.join(self.directory, 'objects', content_hash[:2], f"{content_hash}.html.gz")
+
+    def put(self, url: str, body: bytes, headers: Dict = None, content_hash: str = None) -> bool:
+        """
+        Archive a fetched page and index the fetch.
+        Returns:
+            True if the content was new, False if an identical page was already stored
+        """
+        headers = headers or {}
+        content_hash = content_hash or hashlib.sha256(body).hexdigest()
+        path = self.object_path(content_hash)
+        stored = not os.path.exists(path)
+        if stored:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # mtime=0 keeps the gzip bytes a function of the content alone
+            write_atomic(path, gzip.compress(body, self.compress_level, mtime=0))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO fetches (url, fetched_at, content_hash, size, etag, last_modified) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, datetime.now(timezone.utc).isoformat(), content_hash, len(body),
+                 headers.get('ETag'), headers.get('Last-Modified'))
+            )
+        return stored
+
+    def latest(self, url: str, at: datetime = None) -> Optional[Dict]:
+        """Return the newest archived fetch of url, as of at if given, or None if there is none"""
+        query = "SELECT fetched_at, content_hash, etag, last_modified FROM fetches WHERE url = ?"
+        params = [url]
+        if at is not None:
+            query += " AND fetched_at <= ?"
+            params.append(at.astimezone(timezone.utc).isoformat())
+        with self._lock:
+            row = self._conn.execute(query + " ORDER BY fetched_at DESC LIMIT 1", params).fetchone()
+        if row is None or not os.path.exists(self.object_path(row[1])):
+            return None
+        return dict(zip(('fetched_at', 'content_hash', 'etag', 'last_modified'), row))
+
+    def read(self, content_hash: str) -> bytes:
+        with open(self.object_path(content_hash), 'rb') as f:
+            return gzip.decompress(f.read())
+
+    def load(self, url: str, at: datetime = None) -> Optional[bytes]:
+        """Return the newest archived body of url, or None if it was never archived"""
+        record = self.latest(url, at)
+        return self.read(record['content_hash']) if record else None
+
+    def urls(self, prefix: str = '') -> List[str]:
+        """Return every archived URL starting with prefix"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT url FROM fetches WHERE substr(url, 1, ?) = ? ORDER BY url",
+                (len(prefix), prefix)
+            ).fetchall()
+        return [url for url, in rows]
+
+    def report(self) -> Dict:
+        """Return fetch, page and byte counts, with the size of the stored objects on disk"""
+        with self._lock:
+            fetches, pages, objects, raw_bytes = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT url), COUNT(DISTINCT content_hash), "
+                "COALESCE(SUM(size), 0) FROM fetches"
+            ).fetchone()
+        stored_bytes = 0
+        for root, _, files in os.walk(os.path.join(self.directory, 'objects')):
+            stored_bytes += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return {'fetches': fetches, 'pages': pages, 'objects': objects,
+                'fetched_bytes': raw_bytes, 'stored_bytes': stored_bytes}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def main():
+    """Report what the page archive holds and how much compression saves."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Report on the archive of fetched pages")
+    parser.add_argument('--dir', default=None, help="archive directory (default PAGE_ARCHIVE_DIR or archive/)")
+    args = parser.parse_args()
+
+    directory = archive_root(args.dir)
+    if not os.path.exists(os.path.join(directory, 'index.db')):
+        logger.error(f"No page archive in {directory}")
+        sys.exit(1)
+    archive = PageArchive(directory)
+    try:
+        report = archive.report()
+    finally:
+        archive.close()
+    logger.info(f"{report['fetches']} fetches of {report['pages']} pages, "
+                f"{report['objects']} distinct page bodies")
+    logger.info(f"{report['fetched_bytes'] / 1e6:.1f} MB fetched, stored in "
+                f"{report['stored_bytes'] / 1e6:.1f} MB on disk")
+
+if __name__ == "__main__":
+    main()
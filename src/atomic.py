@@ -0,0 +1,25 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Union
+
+@contextmanager
+def atomic_path(path: str) -> Iterator[str]:
+    """
+    Yield a temporary path next to path to write to, and move it over path
+    once the block succeeds, so readers never see a half-written file.
+    """
+    # Unique per process and thread, so concurrent writers of one path do not share it
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def write_atomic(path: str, content: Union[str, bytes]) -> None:
+    """Replace the file at path with content in one step"""
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, 'wb' if isinstance(content, bytes) else 'w') as f:
+            f.write(content)
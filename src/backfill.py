@@ -0,0 +1,128 @@
+"""Resumable backfill of past seasons.
+
+    python src/backfill.py --teams all --seasons 1980-2024
+    python src/backfill.py --teams LAL BOS --seasons 2000-2010 --parse-processes 4
+
+Team seasons go through the ETL pipeline a batch of seasons at a time, with
+pages parsed in a process pool. Every loaded (team, season), with its game
+logs when those are requested, is checkpointed in the backfill_checkpoints
+table, so rerunning the same command after an
+interruption skips what is already loaded and carries on. Franchises are
+fetched under the abbreviation they played each season under (NJN for the
+Nets before 2013, SEA for the Thunder before 2009, ...), and seasons before
+a franchise existed are skipped.
+"""
+import argparse
+import logging
+import os
+import sys
+from typing import Dict, List, Tuple
+from etl import LakersDataPipeline, parse_targets
+from similarity import index_path
+from snapshot import current_version
+
+logger = logging.getLogger(__name__)
+
+class BackfillPipeline(LakersDataPipeline):
+    """ETL pipeline that checkpoints each team season once it is fully loaded."""
+
+    def run(self, skip_unchanged: bool = False):
+        super().run(skip_unchanged)
+        # Only after the run's derived metrics and game logs are in, so a
+        # crash before then loads the whole batch again on the next run
+        for target in self.targets:
+            if target not in self.failures:
+                self.db.mark_backfilled(*target)
+
+def parse_seasons(values: List[str]) -> List[int]:
+    """Expand season end years and ranges like 1980-2024"""
+    seasons = []
+    for value in values:
+        if '-' in value:
+            first, last = (int(part) for part in value.split('-'))
+            seasons.extend(range(first, last + 1))
+        else:
+            seasons.append(int(value))
+    return sorted(set(seasons))
+
+def run_backfill(targets: List[Tuple[str, int]], batch_seasons: int = 1, restart: bool = False,
+                 **pipeline_options) -> Dict[Tuple[str, int], str]:
+    """
+    Load every target not checkpointed yet, a batch of seasons per pipeline run.
+    Snapshots and the similarity index are published once at the end rather
+    than after every batch.
+    Returns:
+        The targets that failed, with their errors
+    """
+    pipeline = BackfillPipeline(export_snapshot=False, similarity_index=False, **pipeline_options)
+    failures = {}
+    try:
+        if restart:
+            pipeline.db.clear_backfill(targets)
+        done = pipeline.db.completed_backfill(targets)
+        pending = [target for target in targets if target not in done]
+        logger.info(f"{len(done)} of {len(targets)} team seasons already loaded, {len(pending)} to go")
+
+        seasons = sorted({season for _, season in pending})
+        loaded = 0
+        for start in range(0, len(seasons), batch_seasons):
+            batch = set(seasons[start:start + batch_seasons])
+            pipeline.targets = [target for target in pending if target[1] in batch]
+            pipeline.run()
+            failures.update(pipeline.failures)
+            loaded += len(pipeline.targets) - len(pipeline.failures)
+            logger.info(f"Backfilled seasons {min(batch)}-{max(batch)}: {len(done) + loaded} of "
+                        f"{len(targets)} team seasons loaded, {len(failures)} failed")
+
+        # Also publish data an interrupted backfill checkpointed but never published
+        version = pipeline.db.data_version()
+        if version is not None:
+            if loaded or current_version(pipeline.snapshot_dir) != f"v{version}":
+                pipeline.db.export_snapshot(pipeline.snapshot_dir)
+            if loaded or not os.path.exists(index_path(f"v{version}", pipeline.index_dir)):
+                pipeline.db.export_similarity_index(pipeline.index_dir)
+    finally:
+        pipeline.close()
+    return failures
+
+def main():
+    """Entry point for backfilling past seasons."""
+    parser = argparse.ArgumentParser(description="Resumable backfill of past NBA seasons")
+    parser.add_argument('--teams', nargs='+', default=['all'],
+                        help="franchise abbreviations to load, or 'all' for every franchise")
+    parser.add_argument('--seasons', nargs='+', required=True,
+                        help="season end years or ranges like 1980-2024")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('BACKFILL_FETCH_WORKERS', '2')),
+                        help="concurrent page fetches, on top of the per-host rate limit")
+    parser.add_argument('--parse-processes', type=int, default=os.cpu_count() or 1,
+                        help="worker processes parsing pages")
+    parser.add_argument('--batch-seasons', type=int, default=1,
+                        help="seasons loaded per pipeline run, derived metrics are refreshed after each")
+    parser.add_argument('--restart', action='store_true',
+                        help="forget the checkpoints of these targets and load them all again")
+    parser.add_argument('--game-logs', action='store_true',
+                        help="also load per-game logs for every player in the loaded team seasons")
+    parser.add_argument('--snapshot-dir', default=None,
+                        help="where to publish the Parquet snapshot (default SNAPSHOT_DIR or snapshots/)")
+    parser.add_argument('--index-dir', default=None,
+                        help="where to keep the similarity index (default SIMILARITY_INDEX_DIR or indexes/)")
+    parser.add_argument('--archive-dir', default=None,
+                        help="where to keep fetched pages (default PAGE_ARCHIVE_DIR or archive/)")
+    args = parser.parse_args()
+
+    targets = parse_targets(args.teams, parse_seasons(args.seasons))
+    failures = run_backfill(targets, args.batch_seasons, args.restart,
+                            max_workers=args.workers,
+                            parse_processes=args.parse_processes,
+                            game_logs=args.game_logs,
+                            snapshot_dir=args.snapshot_dir,
+                            index_dir=args.index_dir,
+                            archive_dir=args.archive_dir)
+    if failures:
+        logger.error(f"{len(failures)} team seasons failed and will be retried on the next run: "
+                     f"{', '.join(f'{t} {s}' for t, s in sorted(failures, key=lambda target: target[1]))}")
+        sys.exit(1)
+    logger.info("Backfill complete")
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,207 @@
-from sqlalchemy import create_engine
+from sqlalchemy import delete, inspect, or_, select, text, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker
-from models import Base, Team, Player, PlayerStats
+from models import (Base, Team, Player, TeamRoster, PlayerStats, PlayerStatsHistory, DataVersion,
+                    PlayerProfile, PlayerSeasonMetrics, PlayerGameLog, BackfillCheckpoint)
+from derived_metrics import compute_player_profiles, compute_season_metrics
+from metrics import RunMetrics
+from schema import STAT_FIELDS, as_frame, frame_records
+from storage import create_db_engine
+import pandas as pd
 import logging
 import os
-from typing import Dict, List
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Bound parameters allowed in one statement by each backend
+MAX_BIND_PARAMS = {
+    'sqlite': 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999,
+    'postgresql': 65535
+}
+
+HISTORY_FIELDS = ['player_id', 'team_id', 'season', 'content_hash'] + STAT_FIELDS
+
+# Rows for the writers: a frame typed by schema.py, or a list of record dicts
+Records = Union[pd.DataFrame, List[Dict]]
+
 class DatabaseManager:
-    def __init__(self, database_url: str = None):
+    def __init__(self, database_url: str = None, chunk_size: int = 1000, incremental: bool = True,
+                 metrics: RunMetrics = None):
         if database_url is None:
             database_url = os.getenv('DATABASE_URL', 'sqlite:///nba_data.db')
         
-        self.engine = create_engine(database_url)
+        self.engine = create_db_engine(database_url)
+        self._migrate_team_seasons()
         Base.metadata.create_all(self.engine)
+        self._add_missing_columns()
+        # create_all skips indexes on tables that already exist
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(self.engine, checkfirst=True)
         self.Session = sessionmaker(bind=self.engine)
+        self.chunk_size = chunk_size
+        self.incremental = incremental
+        self.metrics = metrics or RunMetrics()
+        self._game_log_partitions = set()
         logger.info("Database tables created successfully")
     
-    def _convert_to_float(self, value: str) -> float:
-        """Convert string to float, handling empty strings and percentage signs"""
-        if not value or value.strip() == '':
-            return 0.0
-        return float(value.rstrip('%'))
+    def _migrate_team_seasons(self) -> None:
+        """Rekey a teams table from older versions, which kept one row per team, by team season"""
+        inspector = inspect(self.engine)
+        if 'teams' not in inspector.get_table_names():
+            return
+        if inspector.get_pk_constraint('teams')['constrained_columns'] != ['team_id']:
+            return
+        existing = {column['name'] for column in inspector.get_columns('teams')}
+        columns = ', '.join(column.name for column in Team.__table__.columns if column.name in existing)
+        dialect = self.engine.dialect.name
+        with self.engine.begin() as conn:
+            if dialect == 'sqlite':
+                # Leave the other tables' references pointing at teams rather than the renamed table
+                conn.execute(text("PRAGMA legacy_alter_table = ON"))
+            conn.execute(text("ALTER TABLE teams RENAME TO teams_by_team"))
+            Team.__table__.create(conn)
+            conn.execute(text(f"INSERT INTO teams ({columns}) SELECT {columns} FROM teams_by_team "
+                              f"WHERE year IS NOT NULL"))
+            # On PostgreSQL the old foreign keys to teams.team_id go with the old table
+            conn.execute(text("DROP TABLE teams_by_team" + (" CASCADE" if dialect == 'postgresql' else "")))
+            if dialect == 'sqlite':
+                conn.execute(text("PRAGMA legacy_alter_table = OFF"))
+        logger.info("Rekeyed the teams table by team season")
+    
+    def _add_missing_columns(self) -> None:
+        """Add model columns missing from tables created by older versions"""
+        inspector = inspect(self.engine)
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(self.engine.dialect)
+                with self.engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                logger.info(f"Added column {table.name}.{column.name}")
+    
+    def _upsert(self, session, model, rows: Records, key_columns: List[str],
+                newer_column: str = None) -> None:
+        """
+        Insert rows or update them on key conflict, one statement per chunk.
+        With newer_column, a stored row is only updated by a row whose value
+        in that column is at least as high, so loading an older season never
+        overwrites data from a newer one.
+        """
+        if len(rows) == 0:
+            return
+        
+        # A statement may not touch the same key twice, so keep the last row per key
+        if isinstance(rows, pd.DataFrame):
+            rows = frame_records(rows.drop_duplicates(key_columns, keep='last'))
+        else:
+            rows = list({tuple(row[key] for key in key_columns): row for row in rows}.values())
+        self.metrics.add('rows_written', len(rows), table=model.__tablename__)
+        
+        dialect = self.engine.dialect.name
+        if dialect == 'postgresql':
+            insert = postgresql.insert
+        elif dialect == 'sqlite':
+            insert = sqlite.insert
+        else:
+            for row in rows:
+                session.merge(model(**row))
+            return
+        
+        columns = list(rows[0].keys())
+        chunk_size = min(self.chunk_size, MAX_BIND_PARAMS[dialect] // len(columns))
+        for start in range(0, len(rows), chunk_size):
+            stmt = insert(model).values(rows[start:start + chunk_size])
+            update_columns = {
+                column: stmt.excluded[column]
+                for column in columns if column not in key_columns
+            }
+            if update_columns:
+                where = None
+                if newer_column:
+                    stored = model.__table__.c[newer_column]
+                    where = or_(stored.is_(None), stored <= stmt.excluded[newer_column])
+                stmt = stmt.on_conflict_do_update(index_elements=key_columns, set_=update_columns, where=where)
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=key_columns)
+            session.execute(stmt)
+    
+    def _fingerprint(self, stats: pd.DataFrame) -> pd.Series:
+        """Hash the stat values of each player season so unchanged rows can be skipped"""
+        hashes = pd.util.hash_pandas_object(stats.reindex(columns=STAT_FIELDS), index=False)
+        return hashes.map('{:016x}'.format)
+    
+    def _stored_fingerprints(self, session, team_id: str, season: int) -> Dict:
+        rows = session.execute(
+            select(PlayerStats.player_id, PlayerStats.content_hash).where(
+                PlayerStats.team_id == team_id,
+                PlayerStats.season == season
+            )
+        )
+        return {player_id: content_hash for player_id, content_hash in rows}
+    
+    def _write_team(self, session, team_data: Dict) -> None:
+        self._upsert(session, Team, [team_data], ['team_id', 'year'])
+    
+    def _write_players(self, session, players_data: Records) -> None:
+        players = as_frame(players_data, Player)
+        self._upsert(session, Player, players, ['player_id'], newer_column='season')
+        if 'season' not in players.columns:
+            return
+        
+        # Roster membership is kept per team season
+        roster = players.reindex(columns=['team_id', 'season', 'player_id', 'number', 'position'])
+        roster = roster.dropna(subset=['team_id', 'season'])
+        for (team_id, season), rows in roster.groupby(['team_id', 'season'], sort=False):
+            session.execute(
+                delete(TeamRoster).where(
+                    TeamRoster.team_id == team_id,
+                    TeamRoster.season == int(season),
+                    TeamRoster.player_id.notin_(rows['player_id'].tolist())
+                )
+            )
+        self._upsert(session, TeamRoster, roster, ['team_id', 'season', 'player_id'])
+    
+    def _write_player_stats(self, session, stats_data: Records) -> None:
+        stats = as_frame(stats_data, PlayerStats)
+        stats['content_hash'] = self._fingerprint(stats)
+        
+        changed = []
+        for (team_id, season), rows in stats.groupby(['team_id', 'season'], sort=False):
+            # Drop players no longer listed for the team season
+            session.execute(
+                delete(PlayerStats).where(
+                    PlayerStats.team_id == team_id,
+                    PlayerStats.season == int(season),
+                    PlayerStats.player_id.notin_(rows['player_id'].tolist())
+                )
+            )
+            
+            stored = self._stored_fingerprints(session, team_id, int(season))
+            changed.append(rows[rows['player_id'].map(stored) != rows['content_hash']])
+        changed = pd.concat(changed) if changed else stats.iloc[:0]
+        
+        self._upsert(session, PlayerStats, changed if self.incremental else stats,
+                     ['player_id', 'team_id', 'season'])
+        
+        # Append each new version of a stat line to the history
+        if len(changed):
+            history = changed[[key for key in HISTORY_FIELDS if key in changed.columns]]
+            history = history.assign(snapshot_at=datetime.now())
+            session.execute(PlayerStatsHistory.__table__.insert(), frame_records(history))
+            self.metrics.add('rows_written', len(history), table=PlayerStatsHistory.__tablename__)
+        logger.info(f"Stats changed for {len(changed)} of {len(stats)} players")
     
     def upsert_team(self, team_data: Dict) -> None:
         """Upsert team data into the database"""
         session = self.Session()
         try:
-            team = session.query(Team).filter_by(team_id=team_data['team_id']).first()
-            if team:
-                for key, value in team_data.items():
-                    setattr(team, key, value)
-            else:
-                team = Team(**team_data)
-                session.add(team)
-            
+            self._write_team(session, team_data)
             session.commit()
             logger.info(f"Successfully upserted team: {team_data['name']}")
         except Exception as e:
@@ -44,19 +210,11 @@ class DatabaseManager:
         finally:
             session.close()
     
-    def upsert_players(self, players_data: List[Dict]) -> None:
+    def upsert_players(self, players_data: Records) -> None:
         """Upsert multiple players into the database"""
         session = self.Session()
         try:
-            for player_data in players_data:
-                player = session.query(Player).filter_by(player_id=player_data['player_id']).first()
-                if player:
-                    for key, value in player_data.items():
-                        setattr(player, key, value)
-                else:
-                    player = Player(**player_data)
-                    session.add(player)
-            
+            self._write_players(session, players_data)
             session.commit()
             logger.info(f"Successfully upserted {len(players_data)} players")
         except Exception as e:
@@ -65,31 +223,11 @@ class DatabaseManager:
         finally:
             session.close()
     
-    def upsert_player_stats(self, stats_data: List[Dict]) -> None:
+    def upsert_player_stats(self, stats_data: Records) -> None:
         """Upsert player statistics into the database"""
         session = self.Session()
         try:
-            # First, remove old stats for the current season
-            session.query(PlayerStats).filter_by(season=2024).delete()
-            
-            # Insert new stats
-            for stat_data in stats_data:
-                # Convert string values to appropriate types
-                for key in ['games_played', 'games_started']:
-                    if key in stat_data and stat_data[key]:
-                        stat_data[key] = int(stat_data[key])
-                
-                for key in ['minutes_played', 'field_goals', 'field_goal_attempts',
-                           'field_goal_percentage', 'three_pointers', 'three_point_attempts',
-                           'three_point_percentage', 'two_pointers', 'two_point_attempts',
-                           'two_point_percentage', 'points_per_game', 'rebounds_per_game',
-                           'assists_per_game']:
-                    if key in stat_data and stat_data[key]:
-                        stat_data[key] = self._convert_to_float(stat_data[key])
-                
-                stats = PlayerStats(**stat_data)
-                session.add(stats)
-            
+            self._write_player_stats(session, stats_data)
             session.commit()
             logger.info(f"Successfully upserted stats for {len(stats_data)} players")
         except Exception as e:
@@ -97,3 +235,292 @@ class DatabaseManager:
             logger.error(f"Error upserting player stats: {str(e)}")
         finally:
             session.close()
+
+    def load_target(self, team_data: Dict, players_data: Records, stats_data: Records) -> bool:
+        """Write a team season's team, roster and stats records in one transaction"""
+        session = self.Session()
+        try:
+            with self.metrics.timer('load'):
+                self._load_target(session, team_data, players_data, stats_data)
+            logger.info(f"Successfully loaded {0 if players_data is None else len(players_data)} players and "
+                        f"stats for {0 if stats_data is None else len(stats_data)} players")
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error loading team season: {str(e)}")
+            return False
+        finally:
+            session.close()
+    
+    def _load_target(self, session, team_data: Dict, players_data: Records, stats_data: Records) -> None:
+        if team_data:
+            self._write_team(session, team_data)
+        if players_data is not None and len(players_data):
+            self._write_players(session, players_data)
+        if stats_data is not None and len(stats_data):
+            self._write_player_stats(session, stats_data)
+        session.commit()
+    
+    def completed_backfill(self, targets: Iterable[Tuple[str, int]]) -> Set[Tuple[str, int]]:
+        """Return the (team_id, season) targets a backfill has already loaded"""
+        targets = set(targets)
+        if not targets:
+            return set()
+        # A checkpoint row per team season is small enough to read whole
+        query = select(BackfillCheckpoint.team_id, BackfillCheckpoint.season)
+        with self.engine.connect() as conn:
+            return {(team_id, season) for team_id, season in conn.execute(query)} & targets
+    
+    def mark_backfilled(self, team_id: str, season: int) -> bool:
+        """Checkpoint a loaded (team_id, season) target so a resumed backfill skips it"""
+        session = self.Session()
+        try:
+            self._upsert(session, BackfillCheckpoint,
+                         [{'team_id': team_id, 'season': season, 'completed_at': datetime.now()}],
+                         ['team_id', 'season'])
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error checkpointing {team_id} {season}: {str(e)}")
+            return False
+        finally:
+            session.close()
+    
+    def clear_backfill(self, targets: Iterable[Tuple[str, int]]) -> None:
+        """Forget the checkpoints of targets so they are loaded again"""
+        targets = list(targets)
+        if not targets:
+            return
+        session = self.Session()
+        try:
+            # Two bind parameters per target
+            chunk_size = MAX_BIND_PARAMS.get(self.engine.dialect.name, 999) // 2
+            for start in range(0, len(targets), chunk_size):
+                session.execute(delete(BackfillCheckpoint).where(
+                    tuple_(BackfillCheckpoint.team_id, BackfillCheckpoint.season).in_(targets[start:start + chunk_size])
+                ))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error clearing backfill checkpoints: {str(e)}")
+        finally:
+            session.close()
+    
+    def bump_data_version(self) -> None:
+        """Mark that new data landed so readers reload their cached copies"""
+        session = self.Session()
+        try:
+            result = session.execute(
+                update(DataVersion).where(DataVersion.id == 1).values(
+                    version=DataVersion.version + 1,
+                    updated_at=datetime.now()
+                )
+            )
+            if result.rowcount == 0:
+                session.add(DataVersion(id=1, version=1, updated_at=datetime.now()))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error bumping data version: {str(e)}")
+        finally:
+            session.close()
+    
+    def refresh_derived_metrics(self, seasons: Iterable[int] = None) -> None:
+        """Recompute the player_profiles and player_season_metrics tables for whole seasons"""
+        session = self.Session()
+        try:
+            with self.metrics.timer('derive'):
+                stats_query = select(PlayerStats)
+                if seasons is not None:
+                    seasons = sorted(set(seasons))
+                    stats_query = stats_query.where(PlayerStats.season.in_(seasons))
+                with self.engine.connect() as conn:
+                    players_df = pd.read_sql(
+                        select(Player.player_id, Player.team_id, Player.height, Player.weight), conn
+                    )
+                    stats_df = pd.read_sql(stats_query, conn)
+                
+                computed_at = datetime.now()
+                profiles = compute_player_profiles(players_df).assign(computed_at=computed_at)
+                season_metrics = compute_season_metrics(stats_df).assign(computed_at=computed_at)
+                
+                session.execute(delete(PlayerProfile))
+                self._upsert(session, PlayerProfile, profiles, ['player_id'])
+                
+                stale = delete(PlayerSeasonMetrics)
+                if seasons is not None:
+                    stale = stale.where(PlayerSeasonMetrics.season.in_(seasons))
+                session.execute(stale)
+                self._upsert(session, PlayerSeasonMetrics, season_metrics,
+                             ['player_id', 'team_id', 'season'])
+                session.commit()
+            logger.info(f"Refreshed derived metrics for {len(season_metrics)} player seasons")
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error refreshing derived metrics: {str(e)}")
+        finally:
+            session.close()
+    
+    def data_version(self) -> Optional[int]:
+        """Return the current data version, or None before the first load"""
+        with self.engine.connect() as conn:
+            return conn.execute(select(DataVersion.version).where(DataVersion.id == 1)).scalar()
+    
+    def snapshot_frames(self) -> Dict[str, pd.DataFrame]:
+        """Read the teams, players and player_stats tables as published in snapshots"""
+        metric_columns = [
+            column for column in PlayerSeasonMetrics.__table__.columns
+            if column.name not in ('player_id', 'team_id', 'season', 'points_per_game', 'computed_at')
+        ]
+        stats_columns = [
+            column for column in PlayerStats.__table__.columns
+            if column.name not in ('id', 'content_hash')
+        ]
+        players_query = (
+            select(Player, PlayerProfile.height_inches, PlayerProfile.weight_lbs)
+            .outerjoin(PlayerProfile, PlayerProfile.player_id == Player.player_id)
+        )
+        stats_query = (
+            select(*stats_columns, *metric_columns)
+            .outerjoin(PlayerSeasonMetrics, (PlayerSeasonMetrics.player_id == PlayerStats.player_id) &
+                       (PlayerSeasonMetrics.team_id == PlayerStats.team_id) &
+                       (PlayerSeasonMetrics.season == PlayerStats.season))
+        )
+        with self.engine.connect() as conn:
+            return {
+                'teams': pd.read_sql(select(Team), conn),
+                'players': pd.read_sql(players_query, conn),
+                'player_stats': pd.read_sql(stats_query, conn)
+            }
+    
+    def export_snapshot(self, directory: str = None) -> Optional[str]:
+        """
+        Publish the current data version as a Parquet snapshot for readers.
+        Returns:
+            Path of the snapshot, or None if there is no data or the export failed
+        """
+        # pyarrow is only paid for by runs that publish
+        import snapshot
+
+        try:
+            version = self.data_version()
+            if version is None:
+                return None
+            with self.metrics.timer('snapshot'):
+                path = snapshot.write_snapshot(self.snapshot_frames(), f"v{version}", directory)
+            logger.info(f"Published snapshot {path}")
+            return path
+        except Exception as e:
+            logger.error(f"Error exporting snapshot: {str(e)}")
+            return None
+    
+    def similarity_frame(self) -> pd.DataFrame:
+        """Read the similarity features of every player season, with the player's name"""
+        import similarity
+
+        query = (
+            select(PlayerStats.player_id, Player.name, PlayerStats.team_id, PlayerStats.season,
+                   *(getattr(PlayerStats, column) for column in similarity.FEATURE_COLUMNS))
+            .join(Player, Player.player_id == PlayerStats.player_id)
+            .order_by(PlayerStats.season, PlayerStats.team_id, PlayerStats.player_id)
+        )
+        with self.engine.connect() as conn:
+            return pd.read_sql(query, conn)
+    
+    def export_similarity_index(self, directory: str = None) -> Optional[str]:
+        """
+        Build and persist the player similarity index of the current data version.
+        Returns:
+            Path of the index, or None if there is no data or the build failed
+        """
+        import similarity
+
+        try:
+            version = self.data_version()
+            if version is None:
+                return None
+            with self.metrics.timer('similarity'):
+                path = similarity.write_index(self.similarity_frame(), f"v{version}", directory)
+            logger.info(f"Published similarity index {path}")
+            return path
+        except ImportError as e:
+            logger.warning(f"Skipping the similarity index: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Error building similarity index: {str(e)}")
+            return None
+    
+    def player_seasons(self, targets: Iterable[Tuple[str, int]]) -> List[Tuple[str, int]]:
+        """Return the (player_id, season) pairs with stats for the given (team_id, season) targets"""
+        targets = list(targets)
+        if not targets:
+            return []
+        query = (
+            select(PlayerStats.player_id, PlayerStats.season)
+            .where(tuple_(PlayerStats.team_id, PlayerStats.season).in_(targets))
+            .distinct()
+            .order_by(PlayerStats.season, PlayerStats.player_id)
+        )
+        with self.engine.connect() as conn:
+            return [(player_id, season) for player_id, season in conn.execute(query)]
+    
+    def _ensure_game_log_partitions(self, session, seasons: Set[int]) -> None:
+        """Create the PostgreSQL partitions of player_game_logs for new seasons"""
+        if self.engine.dialect.name != 'postgresql':
+            return
+        for season in sorted(seasons - self._game_log_partitions):
+            session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS player_game_logs_{season} "
+                f"PARTITION OF player_game_logs FOR VALUES IN ({season})"
+            ))
+            self._game_log_partitions.add(season)
+    
+    def _write_game_log_chunk(self, frames: List[pd.DataFrame]) -> int:
+        chunk = pd.concat(frames, ignore_index=True)
+        session = self.Session()
+        try:
+            with self.metrics.timer('load'):
+                self._ensure_game_log_partitions(session, set(int(season) for season in chunk['season'].unique()))
+                self._upsert(session, PlayerGameLog, chunk, ['season', 'player_id', 'game_date'])
+                session.commit()
+            return len(chunk)
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error writing {len(chunk)} game log rows: {str(e)}")
+            self.metrics.add('game_log_chunks_failed')
+            return 0
+        finally:
+            session.close()
+    
+    def _flush_game_logs(self, frames: List[pd.DataFrame], failed: Optional[Set[Tuple[str, int]]]) -> int:
+        rows = self._write_game_log_chunk(frames)
+        if not rows and failed is not None:
+            for frame in frames:
+                failed.update(zip(frame['player_id'], frame['season'].astype(int).tolist()))
+        return rows
+    
+    def write_game_logs(self, frames: Iterable[pd.DataFrame], chunk_rows: int = 5000,
+                        failed: Optional[Set[Tuple[str, int]]] = None) -> int:
+        """
+        Write a stream of game log frames in transactions of about chunk_rows rows.
+        Only one chunk is held at a time, so memory does not grow with the stream.
+        The (player_id, season) pairs of chunks that could not be written are
+        added to failed if one is passed.
+        Returns:
+            Number of rows written
+        """
+        written = 0
+        buffer = []
+        buffered = 0
+        for frame in frames:
+            buffer.append(frame)
+            buffered += len(frame)
+            if buffered >= chunk_rows:
+                written += self._flush_game_logs(buffer, failed)
+                buffer = []
+                buffered = 0
+        if buffer:
+            written += self._flush_game_logs(buffer, failed)
+        logger.info(f"Wrote {written} game log rows")
+        return written
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+# Percentage columns are stored as fractions (.512), like basketball-reference shows them
+PER_36_COLUMNS = {
+    'points_per_game': 'points_per_36',
+    'rebounds_per_game': 'rebounds_per_36',
+    'assists_per_game': 'assists_per_36'
+}
+
+LEAGUE_PERCENTILE_COLUMNS = {
+    'points_per_game': 'points_league_percentile',
+    'true_shooting_percentage': 'true_shooting_league_percentile',
+    'points_per_36': 'points_per_36_league_percentile'
+}
+
+def _ratio(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    """Divide column-wise, leaving NaN where the denominator is zero or missing"""
+    return numerator / denominator.where(denominator > 0)
+
+def compute_player_profiles(players_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parse roster height ('6-9') and weight strings into numbers.
+    Returns:
+        One row per player with height_inches and weight_lbs
+    """
+    height = players_df['height'].astype('string').str.extract(r'^(\d+)-(\d+)$').astype(float)
+    profiles = pd.DataFrame({
+        'player_id': players_df['player_id'],
+        'team_id': players_df['team_id'],
+        'height_inches': height[0] * 12 + height[1],
+        'weight_lbs': pd.to_numeric(players_df['weight'], errors='coerce')
+    })
+    return profiles.astype({'height_inches': 'Int64', 'weight_lbs': 'Int64'})
+
+def compute_season_metrics(stats_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute advanced and relative metrics for every player season at once.
+    Adds true shooting and effective field goal percentages, per-36 minute
+    rates and percentile ranks within the team and the league season.
+    Returns:
+        One row per (player_id, team_id, season)
+    """
+    metrics = stats_df[['player_id', 'team_id', 'season', 'points_per_game']].copy()
+
+    # Per-game averages multiply out to the same ratios as season totals
+    metrics['true_shooting_percentage'] = _ratio(
+        stats_df['points_per_game'],
+        2 * (stats_df['field_goal_attempts'] + 0.44 * stats_df['free_throw_attempts'].fillna(0))
+    )
+    metrics['effective_field_goal_percentage'] = _ratio(
+        stats_df['field_goals'] + 0.5 * stats_df['three_pointers'],
+        stats_df['field_goal_attempts']
+    )
+    for column, per_36 in PER_36_COLUMNS.items():
+        metrics[per_36] = _ratio(stats_df[column] * 36, stats_df['minutes_played'])
+
+    metrics['points_team_percentile'] = (
+        metrics.groupby(['season', 'team_id'])['points_per_game'].rank(pct=True)
+    )
+    league = metrics.groupby('season')
+    for column, percentile in LEAGUE_PERCENTILE_COLUMNS.items():
+        metrics[percentile] = league[column].rank(pct=True)
+
+    return metrics.replace([np.inf, -np.inf], np.nan)
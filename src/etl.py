@@ -1,9 +1,25 @@
 import os
+import argparse
+import cProfile
 import logging
+import multiprocessing
+import pstats
+import queue
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Callable, List, Tuple
+import schedule
 from dotenv import load_dotenv
-from scraper import LakersDataScraper
+from archive import PageArchive
+from fetcher import FetchError
+from scraper import LakersDataScraper, NBA_TEAMS, parse_target_page, season_team_id
 from database import DatabaseManager
+from metrics import RunMetrics
 
 # Load environment variables
 load_dotenv()
@@ -14,43 +30,455 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+try:
+    import fcntl
+except ImportError:  # Windows has no flock, so only the in-process lock applies
+    fcntl = None
+
+@contextmanager
+def run_lock(lock_path: str):
+    """Hold an exclusive lock file for the duration of a run.
+
+    Yields:
+        True if the lock was acquired, False if another process holds it
+    """
+    with open(lock_path, 'w') as lock_file:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Queue marker telling a stage worker to exit
+STOP = object()
+
 class LakersDataPipeline:
-    def __init__(self):
-        """Initialize the Lakers data pipeline."""
+    def __init__(self, targets: List[Tuple[str, int]] = None, max_workers: int = None,
+                 incremental: bool = True, parse_workers: int = None, load_workers: int = 1,
+                 queue_size: int = None, report_path: str = None, metrics_textfile: str = None,
+                 profile_path: str = None, snapshot_dir: str = None, export_snapshot: bool = True,
+                 game_logs: bool = False, game_log_chunk_rows: int = None,
+                 similarity_index: bool = True, index_dir: str = None, parse_processes: int = 0,
+                 archive_pages: bool = True, archive_dir: str = None, reparse: bool = False):
+        """Initialize the data pipeline.
+        
+        Pages move through fetch, parse and load stages joined by bounded
+        queues, so downloads for one target overlap parsing and database
+        writes for the ones before it.
+        
+        Args:
+            targets: (team_id, season) pairs to load, defaults to the Lakers 2024 season,
+                or every archived team season when reparsing
+            max_workers: number of concurrent page fetches
+            incremental: only rewrite stat lines whose content changed
+            parse_workers: number of concurrent page parses
+            load_workers: number of concurrent database writers
+            queue_size: pages allowed to wait between two stages
+            report_path: where to write the JSON run report
+            metrics_textfile: where to write run metrics for the Prometheus textfile collector
+            profile_path: where to write a cProfile dump of each run, covering every stage worker
+            snapshot_dir: where to publish Parquet snapshots, defaults to SNAPSHOT_DIR or snapshots/
+            export_snapshot: publish a snapshot after each run that loaded data
+            game_logs: also stream the per-game logs of every player in the loaded team seasons
+            game_log_chunk_rows: game log rows written per transaction
+            similarity_index: rebuild the player similarity index after each run that loaded data
+            index_dir: where to keep similarity indexes, defaults to SIMILARITY_INDEX_DIR or indexes/
+            parse_processes: parse pages in this many worker processes instead of
+                parse_workers threads, for loads where parsing is the bottleneck
+            archive_pages: keep every fetched page in a compressed archive and
+                revalidate pages against it with conditional requests
+            archive_dir: where to keep the page archive, defaults to PAGE_ARCHIVE_DIR or archive/
+            reparse: rebuild the database from the archived pages, without network access
+        """
         db_url = os.getenv('DATABASE_URL', 'sqlite:///nba_data.db')
-        self.db = DatabaseManager(db_url)
-        self.scraper = LakersDataScraper()
+        self.metrics = RunMetrics()
+        self.report_path = report_path or os.getenv('ETL_REPORT_PATH')
+        self.metrics_textfile = metrics_textfile or os.getenv('ETL_METRICS_TEXTFILE')
+        self.profile_path = profile_path
+        self.snapshot_dir = snapshot_dir
+        self.export_snapshot = export_snapshot
+        self.game_logs = game_logs
+        if game_log_chunk_rows is None:
+            game_log_chunk_rows = int(os.getenv('GAME_LOG_CHUNK_ROWS', '5000'))
+        self.game_log_chunk_rows = game_log_chunk_rows
+        self.similarity_index = similarity_index
+        self.index_dir = index_dir
+        self._profiles = []
+        self.db = DatabaseManager(db_url, incremental=incremental, metrics=self.metrics)
+        if max_workers is None:
+            max_workers = int(os.getenv('SCRAPER_MAX_WORKERS', '4'))
+        self.max_workers = max_workers
+        if parse_workers is None:
+            parse_workers = int(os.getenv('PARSE_WORKERS', '2'))
+        self.parse_workers = parse_workers
+        self.parse_processes = parse_processes
+        self._parse_pool = None
+        self.load_workers = load_workers
+        self.queue_size = queue_size or 2 * max_workers
+        self.reparse = reparse
+        self.archive = PageArchive(archive_dir) if archive_pages or reparse else None
+        self.scraper = LakersDataScraper(pool_size=max_workers, metrics=self.metrics, archive=self.archive)
+        if reparse:
+            # Read every page from the archive, so a parser fix costs no downloads
+            self.scraper.pages.offline = True
+            targets = targets or self.scraper.archived_targets()
+        self.targets = targets or [('LAL', 2024)]
+        self.failures = {}
+        self._run_lock = threading.Lock()
+        self._failures_lock = threading.Lock()
+        
+    def _fetch(self, target: Tuple[str, int], _):
+        return self.scraper.pages.fetch(self.scraper.team_url(*target))
         
-    def run(self):
-        """Run the data pipeline."""
+    def _parse(self, target: Tuple[str, int], body: bytes):
+        if self._parse_pool is not None:
+            future = self._parse_pool.submit(parse_target_page, *target, body, self.scraper.base_url)
+            # The worker has its own copy of the page, so the parent's cache need not hold it
+            self.scraper.pages.evict(self.scraper.team_url(*target))
+            records, worker_metrics, page_stats = future.result()
+            # Parse and transform work is timed and counted in the worker process
+            self.metrics.merge(worker_metrics)
+            self.scraper.pages.merge_stats(page_stats)
+            return records
+        self.scraper.pages.parse(self.scraper.team_url(*target), body)
+        return self.scraper.scrape_target(*target)
+        
+    def close(self):
+        """Shut down the parse worker processes and close the page archive."""
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+        if self.archive is not None:
+            self.archive.close()
+        
+    def _load(self, target: Tuple[str, int], records: dict):
+        if not self.db.load_target(records['team'], records['roster'], records['stats']):
+            raise RuntimeError("database load failed")
+        logger.info(f"Loaded {target[0]} {target[1]}")
+        
+    def _start_stage(self, name: str, handler: Callable, inbox: queue.Queue,
+                     outbox: queue.Queue, workers: int) -> List[threading.Thread]:
+        """Start workers that pass each (target, payload) item through handler.
+        
+        A failing item is recorded against its target and dropped, so the
+        rest of the run carries on.
+        """
+        def work():
+            if self.profile_path:
+                profiler = cProfile.Profile()
+                with self._failures_lock:
+                    self._profiles.append(profiler)
+                profiler.enable()
+            try:
+                process()
+            finally:
+                if self.profile_path:
+                    profiler.disable()
+        
+        def process():
+            while True:
+                item = inbox.get()
+                if item is STOP:
+                    return
+                target, payload = item
+                try:
+                    result = handler(target, payload)
+                except Exception as e:
+                    logger.error(f"Error in {name} stage for {target[0]} {target[1]}: {str(e)}")
+                    with self._failures_lock:
+                        self.failures[target] = f"{name}: {str(e)}"
+                    continue
+                if outbox is not None:
+                    outbox.put((target, result))
+        
+        threads = [
+            threading.Thread(target=work, name=f"{name}-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+        
+    def run(self, skip_unchanged: bool = False):
+        """Run the data pipeline.
+        
+        Args:
+            skip_unchanged: check each page with a conditional GET first and
+                only parse and load the ones that changed since the last run
+        """
+        if not self._run_lock.acquire(blocking=False):
+            logger.warning("Previous pipeline run still in progress, skipping")
+            return
+        self._profiles = []
+        if self.profile_path:
+            profiler = cProfile.Profile()
+            self._profiles.append(profiler)
+            profiler.enable()
         try:
-            # Get Lakers team info
-            logger.info("Getting Lakers team info...")
-            team_data = self.scraper.get_team_info()
-            if team_data:
-                self.db.upsert_team(team_data)
+            self.scraper.reset()
+            self.metrics.reset()
+            
+            targets = self.targets
+            if skip_unchanged:
+                # Targets that failed last time are retried even if their page is unchanged
+                retry = [target for target in targets if target in self.failures]
+                unchecked = [target for target in targets if target not in self.failures]
+                targets = retry + self.scraper.changed_targets(unchecked, self.max_workers)
+                if not targets:
+                    logger.info("No upstream changes since the last run, skipping")
+                    return
             
-            # Get Lakers roster
-            logger.info("Getting Lakers roster...")
-            roster_data = self.scraper.get_roster()
-            if roster_data:
-                self.db.upsert_players(roster_data)
+            self.failures = {}
+            parse_workers = self.parse_workers
+            if self.parse_processes:
+                if self._parse_pool is None:
+                    # Forking a process whose stage threads hold locks can deadlock the child
+                    self._parse_pool = ProcessPoolExecutor(self.parse_processes,
+                                                           mp_context=multiprocessing.get_context('spawn'))
+                # One thread per process keeps every process busy
+                parse_workers = self.parse_processes
+            logger.info(
+                f"Loading {len(targets)} team seasons {'from the page archive ' if self.reparse else ''}"
+                f"with {self.max_workers} fetch, {parse_workers} parse"
+                f"{' process' if self.parse_processes else ''} and {self.load_workers} load workers..."
+            )
+            fetch_queue = queue.Queue()
+            parse_queue = queue.Queue(maxsize=self.queue_size)
+            load_queue = queue.Queue(maxsize=self.queue_size)
+            stages = [
+                (self._start_stage('fetch', self._fetch, fetch_queue, parse_queue, self.max_workers), fetch_queue),
+                (self._start_stage('parse', self._parse, parse_queue, load_queue, parse_workers), parse_queue),
+                (self._start_stage('load', self._load, load_queue, None, self.load_workers), load_queue)
+            ]
             
-            # Get Lakers player stats
-            logger.info("Getting Lakers player stats...")
-            stats_data = self.scraper.get_player_stats()
-            if stats_data:
-                self.db.upsert_player_stats(stats_data)
+            for target in targets:
+                fetch_queue.put((target, None))
             
-            logger.info("Lakers data pipeline completed successfully")
+            # Shut the stages down in order once each one has drained
+            for threads, inbox in stages:
+                for _ in threads:
+                    inbox.put(STOP)
+                for thread in threads:
+                    thread.join()
+            
+            loaded = len(targets) - len(self.failures)
+            if loaded:
+                self.db.refresh_derived_metrics({season for _, season in targets})
+                if self.game_logs:
+                    self._load_game_logs([target for target in targets if target not in self.failures])
+                self.db.bump_data_version()
+                if self.export_snapshot:
+                    self.db.export_snapshot(self.snapshot_dir)
+                if self.similarity_index:
+                    self.db.export_similarity_index(self.index_dir)
+            # Game log failures come in after the stages, so count again
+            self.metrics.set('targets_loaded', len(targets) - len(self.failures))
+            self.metrics.set('targets_failed', len(self.failures))
+            if self.failures:
+                logger.error(f"{len(self.failures)} of {len(targets)} team seasons failed: "
+                             f"{', '.join(f'{t} {s}' for t, s in self.failures)}")
+            
+            page_stats = self.scraper.pages.stats
+            logger.info(
+                f"Page cache: {page_stats['fetches']} fetches, {page_stats['parses']} parses "
+                f"({page_stats['fetches_saved']} fetches and {page_stats['parses_saved']} parses saved)"
+            )
+            if self.failures:
+                logger.error("Data pipeline completed with failures")
+            else:
+                logger.info("Data pipeline completed successfully")
         except Exception as e:
-            logger.error(f"Error in Lakers data pipeline: {str(e)}")
+            logger.error(f"Error in data pipeline: {str(e)}")
             raise
+        finally:
+            if self.profile_path:
+                profiler.disable()
+                self._write_profile()
+            self._write_metrics()
+            self._run_lock.release()
+        
+    def _load_game_logs(self, targets: List[Tuple[str, int]]):
+        """Stream the game logs of every player in the loaded team seasons into the database."""
+        players = self.db.player_seasons(targets)
+        logger.info(f"Loading game logs for {len(players)} player seasons...")
+        failed = set()
+        games = self.scraper.iter_game_logs(players, self.max_workers, failed)
+        try:
+            rows = self.db.write_game_logs(games, self.game_log_chunk_rows, failed)
+        except FetchError as e:
+            # Record the seasons as failed so the next run retries them
+            logger.error(f"Stopped loading game logs: {str(e)}")
+            with self._failures_lock:
+                for target in targets:
+                    self.failures[target] = f"game logs: {str(e)}"
+            return
+        self.metrics.set('game_log_rows', rows)
+        if failed:
+            # Fail the team seasons of the missing logs so the run reports them and the next run retries
+            with self._failures_lock:
+                for target in targets:
+                    missing = failed.intersection(self.db.player_seasons([target]))
+                    if missing:
+                        self.failures[target] = f"game logs: {len(missing)} player seasons failed"
+        
+    def _write_profile(self):
+        """Merge the main thread and stage worker profiles into one dump."""
+        try:
+            stats = pstats.Stats(*self._profiles)
+            stats.dump_stats(self.profile_path)
+            logger.info(f"Wrote profile to {self.profile_path}")
+        except (OSError, TypeError) as e:
+            logger.error(f"Error writing profile: {str(e)}")
+        
+    def _write_metrics(self):
+        """Log the run's timings and write the configured metric files."""
+        logger.info(self.metrics.summary())
+        try:
+            if self.report_path:
+                self.metrics.write_json(self.report_path)
+            if self.metrics_textfile:
+                self.metrics.write_prometheus(self.metrics_textfile)
+        except OSError as e:
+            logger.error(f"Error writing run metrics: {str(e)}")
+
+def parse_targets(teams: List[str], seasons: List[int]) -> List[Tuple[str, int]]:
+    """Expand franchises and seasons into (team_id, season) targets under each season's abbreviation.
+
+    Seasons before a franchise existed are skipped.
+    """
+    if teams == ['all']:
+        teams = list(NBA_TEAMS)
+    targets = []
+    for season in seasons:
+        for team_id in teams:
+            abbreviation = season_team_id(team_id, season)
+            if abbreviation is not None:
+                targets.append((abbreviation, season))
+    return targets
+
+def run_daemon(pipeline: LakersDataPipeline, interval_hours: float = 6,
+               jitter_minutes: float = 10, lock_path: str = None):
+    """Run the pipeline now and then on a jittered schedule until interrupted.
+
+    Scheduled runs skip parsing and database writes for pages that have not
+    changed upstream, and a lock file keeps runs from overlapping with other
+    processes loading the same database.
+    """
+    if lock_path is None:
+        lock_path = os.getenv('ETL_LOCK_FILE', os.path.join(tempfile.gettempdir(), 'nba_etl.lock'))
+        
+    def job(skip_unchanged: bool = True):
+        with run_lock(lock_path) as acquired:
+            if not acquired:
+                logger.warning(f"Another pipeline run holds {lock_path}, skipping")
+                return
+            try:
+                pipeline.run(skip_unchanged=skip_unchanged)
+            except Exception:
+                # Keep the daemon alive, the next scheduled run retries
+                pass
+
+    # Run immediately upon startup
+    job(skip_unchanged=False)
+
+    interval_minutes = interval_hours * 60
+    earliest = max(1, int(interval_minutes - jitter_minutes))
+    latest = max(earliest, int(interval_minutes + jitter_minutes))
+    schedule.every(earliest).to(latest).minutes.do(job)
+    logger.info(f"Scheduled pipeline runs every {earliest}-{latest} minutes")
+
+    while True:
+        schedule.run_pending()
+        time.sleep(min(60, max(1, schedule.idle_seconds() or 1)))
 
 def main():
     """Main entry point for the ETL pipeline."""
-    pipeline = LakersDataPipeline()
-    pipeline.run()
+    parser = argparse.ArgumentParser(description="NBA data ETL pipeline")
+    parser.add_argument('--teams', nargs='+', default=None,
+                        help="team abbreviations to load, or 'all' for every franchise (default LAL)")
+    parser.add_argument('--seasons', nargs='+', type=int, default=None,
+                        help="season end years to load (default 2024)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of concurrent page fetches")
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help="number of concurrent page parses")
+    parser.add_argument('--parse-processes', type=int, default=0,
+                        help="parse pages in this many worker processes instead of threads")
+    parser.add_argument('--load-workers', type=int, default=1,
+                        help="number of concurrent database writers (keep 1 for SQLite)")
+    parser.add_argument('--full-refresh', action='store_true',
+                        help="rewrite every stat line instead of only changed ones")
+    parser.add_argument('--report', default=None,
+                        help="write a JSON run report to this path")
+    parser.add_argument('--metrics-textfile', default=None,
+                        help="write run metrics to this Prometheus textfile")
+    parser.add_argument('--profile', nargs='?', const='etl.prof', default=None,
+                        help="save a cProfile dump of the run (default etl.prof)")
+    parser.add_argument('--snapshot-dir', default=None,
+                        help="where to publish Parquet snapshots (default SNAPSHOT_DIR or snapshots/)")
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help="skip publishing a Parquet snapshot after each run")
+    parser.add_argument('--index-dir', default=None,
+                        help="where to keep player similarity indexes (default SIMILARITY_INDEX_DIR or indexes/)")
+    parser.add_argument('--no-similarity-index', action='store_true',
+                        help="skip rebuilding the player similarity index after each run")
+    parser.add_argument('--game-logs', action='store_true',
+                        help="also load per-game logs for every player in the loaded team seasons")
+    parser.add_argument('--archive-dir', default=None,
+                        help="where to keep fetched pages (default PAGE_ARCHIVE_DIR or archive/)")
+    parser.add_argument('--no-archive', action='store_true',
+                        help="do not archive fetched pages or revalidate against the archive")
+    parser.add_argument('--reparse', action='store_true',
+                        help="rebuild the database from archived pages without network access, "
+                             "every archived team season unless --teams or --seasons is given")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running and reload on a schedule")
+    parser.add_argument('--interval-hours', type=float,
+                        default=float(os.getenv('ETL_INTERVAL_HOURS', '6')),
+                        help="hours between scheduled runs in daemon mode")
+    parser.add_argument('--jitter-minutes', type=float,
+                        default=float(os.getenv('ETL_JITTER_MINUTES', '10')),
+                        help="random spread applied to each scheduled run")
+    args = parser.parse_args()
+    if args.reparse and args.daemon:
+        parser.error("--reparse runs once, it cannot be combined with --daemon")
+
+    targets = None
+    if not args.reparse or args.teams or args.seasons:
+        targets = parse_targets(args.teams or ['LAL'], args.seasons or [2024])
+    pipeline = LakersDataPipeline(targets, args.workers,
+                                  incremental=not args.full_refresh,
+                                  parse_workers=args.parse_workers,
+                                  parse_processes=args.parse_processes,
+                                  load_workers=args.load_workers,
+                                  report_path=args.report,
+                                  metrics_textfile=args.metrics_textfile,
+                                  profile_path=args.profile,
+                                  snapshot_dir=args.snapshot_dir,
+                                  export_snapshot=not args.no_snapshot,
+                                  game_logs=args.game_logs,
+                                  similarity_index=not args.no_similarity_index,
+                                  index_dir=args.index_dir,
+                                  archive_pages=not args.no_archive,
+                                  archive_dir=args.archive_dir,
+                                  reparse=args.reparse)
+    if args.daemon:
+        run_daemon(pipeline, args.interval_hours, args.jitter_minutes)
+    else:
+        try:
+            pipeline.run()
+        finally:
+            pipeline.close()
+        if pipeline.failures:
+            # Let cron and CI tell a partial run from a clean one
+            sys.exit(1)
 
 if __name__ == "__main__":
     main()
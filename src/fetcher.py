@@ -0,0 +1,257 @@
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import requests
+from metrics import RunMetrics
+
+logger = logging.getLogger(__name__)
+
+# Published request limits of the sites we scrape, in requests per second.
+# basketball-reference blocks clients that go over 20 requests a minute.
+HOST_RATE_LIMITS = {
+    'www.basketball-reference.com': 20 / 60
+}
+
+# Responses that mean the server wants us to slow down
+THROTTLE_STATUSES = {429, 503}
+RETRY_STATUSES = THROTTLE_STATUSES | {500, 502, 504}
+
+class FetchError(Exception):
+    """A page could not be fetched after every retry, or its host's circuit is open."""
+
+class CircuitOpenError(FetchError):
+    pass
+
+class TokenBucket:
+    """Allow rate requests per second on average, with bursts of up to burst."""
+
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Wait for a token. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+class CircuitBreaker:
+    """Stop calling a host after repeated failures, then let one probe through after a cool-down."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._probe_thread = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # Half-open: a single request decides whether the host is back
+            self._probing = True
+            self._probe_thread = threading.get_ident()
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure. Returns True if this opened the circuit."""
+        with self._lock:
+            self._failures += 1
+            was_open = self._opened_at is not None and not self._probing
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._probing = False
+                return not was_open
+            return False
+
+    def release_probe(self) -> None:
+        """
+        End the calling thread's half-open probe if it was neither a success
+        nor a failure, so the circuit stays open for another cool-down and
+        then admits a new probe instead of rejecting every request
+        """
+        with self._lock:
+            if self._probing and self._probe_thread == threading.get_ident():
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+class HostThrottle:
+    """
+    Per-host request limits that adapt to the server's throttling signals.
+    Concurrency and request rate are cut in half whenever the host answers
+    429/503, and grow back additively after a run of successes, up to the
+    configured ceilings (AIMD, as in TCP congestion control).
+    """
+
+    def __init__(self, max_concurrency: int, rate: Optional[float], burst: float = 1):
+        self.max_concurrency = max_concurrency
+        self.max_rate = rate
+        self.concurrency = max_concurrency
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.breaker = CircuitBreaker(
+            int(os.getenv('SCRAPER_BREAKER_FAILURES', '5')),
+            float(os.getenv('SCRAPER_BREAKER_RESET_SECONDS', '60'))
+        )
+        self._in_flight = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self._in_flight >= self.concurrency:
+                self._condition.wait()
+            self._in_flight += 1
+        if self.bucket:
+            self.bucket.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def on_success(self) -> None:
+        with self._condition:
+            self._successes += 1
+            if self._successes < self.concurrency:
+                return
+            self._successes = 0
+            if self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self._condition.notify()
+            if self.bucket and self.bucket.rate < self.max_rate:
+                self.bucket.rate = min(self.max_rate, self.bucket.rate + self.max_rate / 10)
+
+    def on_throttle(self) -> None:
+        with self._condition:
+            self._successes = 0
+            self.concurrency = max(1, self.concurrency // 2)
+            if self.bucket:
+                self.bucket.rate = max(self.max_rate / 20, self.bucket.rate / 2)
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+class Fetcher:
+    """
+    GET pages politely: a per-host token bucket and adaptive concurrency
+    limit, timeouts, retries with exponential backoff and full jitter that
+    honour Retry-After, and a per-host circuit breaker.
+    """
+
+    def __init__(self, session: requests.Session, metrics: RunMetrics = None, max_concurrency: int = 8,
+                 max_retries: int = None, backoff_base: float = None, backoff_max: float = None,
+                 timeout: tuple = None):
+        self.session = session
+        self.metrics = metrics or RunMetrics()
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('SCRAPER_MAX_RETRIES', '5'))
+        self.backoff_base = backoff_base if backoff_base is not None else float(os.getenv('SCRAPER_BACKOFF_BASE', '1'))
+        self.backoff_max = backoff_max if backoff_max is not None else float(os.getenv('SCRAPER_BACKOFF_MAX', '120'))
+        self.timeout = timeout or (
+            float(os.getenv('SCRAPER_CONNECT_TIMEOUT', '5')),
+            float(os.getenv('SCRAPER_READ_TIMEOUT', '30'))
+        )
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def throttle(self, host: str) -> HostThrottle:
+        with self._lock:
+            if host not in self._hosts:
+                rate = os.getenv('SCRAPER_RATE_LIMIT')
+                rate = float(rate) if rate else HOST_RATE_LIMITS.get(host)
+                self._hosts[host] = HostThrottle(self.max_concurrency, rate)
+            return self._hosts[host]
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, url: str, headers: Dict = None) -> requests.Response:
+        """
+        Return the response for url, retrying throttling, server errors and
+        network failures. Other client errors are returned for the caller
+        to raise.
+        Raises:
+            FetchError: every attempt failed or the host's circuit is open
+        """
+        host = urlsplit(url).netloc
+        throttle = self.throttle(host)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if not throttle.breaker.allow():
+                self.metrics.add('http_circuit_rejected')
+                raise CircuitOpenError(f"Circuit open for {host}, not fetching {url}")
+
+            wait = None
+            throttled = False
+            try:
+                try:
+                    with throttle:
+                        response = self.session.get(url, headers=headers, timeout=self.timeout)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    last_error = f"{type(e).__name__}: {str(e)}"
+                else:
+                    if response.status_code not in RETRY_STATUSES:
+                        throttle.breaker.record_success()
+                        throttle.on_success()
+                        return response
+                    last_error = f"HTTP {response.status_code}"
+                    if response.status_code in THROTTLE_STATUSES:
+                        throttled = True
+                        self.metrics.add('http_throttled')
+                        throttle.on_throttle()
+                        wait = retry_after_seconds(response.headers.get('Retry-After'))
+
+                # A host asking us to back off is still up, only errors count towards the breaker
+                if not throttled and throttle.breaker.record_failure():
+                    logger.error(f"Opened circuit for {host} after repeated failures")
+            finally:
+                # A probe that was throttled or raised must not hold the half-open slot forever
+                throttle.breaker.release_probe()
+            if attempt == self.max_retries:
+                break
+            wait = max(wait or 0, self._backoff(attempt))
+            self.metrics.add('http_retries')
+            logger.warning(f"{last_error} fetching {url}, retry {attempt + 1} of {self.max_retries} in {wait:.1f}s")
+            time.sleep(wait)
+
+        raise FetchError(f"Giving up on {url} after {self.max_retries + 1} attempts: {last_error}")
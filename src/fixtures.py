@@ -0,0 +1,317 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from scraper import LIVE_BASE_URL, NBA_TEAMS, LakersDataScraper, team_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures')
+
+class FixtureStore:
+    """Pages saved on disk under their URL path, with their validators in a .json sidecar."""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or os.getenv('FIXTURE_DIR', DEFAULT_FIXTURE_DIR)
+
+    def path(self, url: str) -> str:
+        return os.path.join(self.directory, urlsplit(url).path.lstrip('/'))
+
+    def save(self, url: str, body: bytes, headers: Dict = None) -> None:
+        headers = headers or {}
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(body)
+        with open(f"{path}.json", 'w') as f:
+            json.dump({
+                'url': url,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'recorded_at': datetime.now().isoformat()
+            }, f, indent=2)
+        logger.info(f"Recorded {url} ({len(body)} bytes)")
+
+    def load(self, url: str) -> Optional[Tuple[bytes, Dict]]:
+        """Return a recorded page body and its metadata, or None if it was never recorded"""
+        path = self.path(url)
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+        try:
+            with open(f"{path}.json") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            meta = {}
+        return body, meta
+
+class RecordingAdapter(HTTPAdapter):
+    """Transport adapter that saves every successful GET into a FixtureStore."""
+
+    def __init__(self, store: FixtureStore, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if request.method == 'GET' and response.status_code == 200:
+            self.store.save(request.url, response.content, response.headers)
+        return response
+
+def record(scraper: LakersDataScraper, store: FixtureStore, pool_size: int = 8) -> None:
+    """Make a scraper save every page it fetches as a fixture."""
+    adapter = RecordingAdapter(store, pool_connections=pool_size, pool_maxsize=pool_size)
+    scraper.session.mount('http://', adapter)
+    scraper.session.mount('https://', adapter)
+
+def _cell_text(value) -> str:
+    # Shaped like the site's cells: counts as is, rates to three places, averages to one
+    if value is None:
+        return ''
+    if isinstance(value, int):
+        return str(value)
+    return f"{value:.3f}" if value < 1 else f"{value:.1f}"
+
+def synthetic_page(team_id: str, season: int, players: int = 15) -> bytes:
+    """
+    Build a team season page in basketball-reference's layout with made-up
+    players, so workloads can scale past the recorded pages. The same team
+    and season always give the same page.
+    """
+    rng = random.Random(f"{team_id}-{season}")
+    name = team_name(team_id)
+    wins = rng.randint(15, 65)
+    roster_rows = []
+    stats_rows = []
+    for i in range(players):
+        player_id = f"{team_id.lower()}{season % 100:02d}{i:02d}"
+        link = f'<a href="/players/{player_id[0]}/{player_id}.html">Player {team_id} {season} {i}</a>'
+        roster_rows.append(
+            f'<tr><th data-stat="number">{i}</th>'
+            f'<td data-append-csv="{player_id}" data-stat="player">{link}</td>'
+            f'<td data-stat="pos">{rng.choice(["PG", "SG", "SF", "PF", "C"])}</td>'
+            f'<td data-stat="height">{rng.randint(6, 7)}-{rng.randint(0, 11)}</td>'
+            f'<td data-stat="weight">{rng.randint(170, 270)}</td>'
+            f'<td data-stat="college">College {rng.randint(1, 300)}</td></tr>'
+        )
+        games = rng.randint(1, 82)
+        fga, fg3a, fta = rng.uniform(1, 20), rng.uniform(0, 10), rng.uniform(0, 8)
+        fg3 = fg3a * rng.uniform(0.2, 0.45)
+        fg2 = (fga - fg3a) * rng.uniform(0.4, 0.6) if fga > fg3a else 0.0
+        ft = fta * rng.uniform(0.6, 0.9)
+        values = [
+            games, rng.randint(0, games), rng.uniform(5, 38), fg2 + fg3, fga, (fg2 + fg3) / fga,
+            fg3, fg3a, fg3 / fg3a if fg3a else None, fg2, max(fga - fg3a, 0.0),
+            fg2 / (fga - fg3a) if fga > fg3a else None, ft, fta, ft / fta if fta else None,
+            rng.uniform(0, 14), rng.uniform(0, 11), 2 * fg2 + 3 * fg3 + ft
+        ]
+        cells = ''.join(f'<td>{_cell_text(value)}</td>' for value in values)
+        stats_rows.append(
+            f'<tr><th data-stat="ranker">{i + 1}</th>'
+            f'<td data-append-csv="{player_id}" data-stat="name_display">{link}</td>'
+            f'<td>{rng.randint(19, 38)}</td><td>{rng.choice(["PG", "SG", "SF", "PF", "C"])}</td>{cells}</tr>'
+        )
+
+    stats_headers = ['Rk', 'Player', 'Age', 'Pos', 'G', 'GS', 'MP', 'FG', 'FGA', 'FG%', '3P', '3PA', '3P%',
+                     '2P', '2PA', '2P%', 'FT', 'FTA', 'FT%', 'TRB', 'AST', 'PTS']
+    page = (
+        f'<html><body><div id="info"><h1><span>{season - 1}-{str(season)[2:]}</span> <span>{name}</span> '
+        f'Roster and Stats</h1></div><div class="scoreboard"><div>{wins}-{82 - wins}</div></div>'
+        '<table id="roster"><thead><tr><th>No.</th><th>Player</th><th>Pos</th><th>Ht</th><th>Wt</th>'
+        f'<th>College</th></tr></thead><tbody>{"".join(roster_rows)}</tbody></table>'
+        # basketball-reference ships most stats tables inside comments
+        f'<!--<table id="per_game_stats"><thead><tr>{"".join(f"<th>{h}</th>" for h in stats_headers)}</tr></thead>'
+        f'<tbody>{"".join(stats_rows)}</tbody></table>--></body></html>'
+    )
+    return page.encode('utf-8')
+
+def synthetic_game_log(player_id: str, season: int, games: int = 82) -> bytes:
+    """Build a player's game log page with made-up games, including a missed one."""
+    rng = random.Random(f"{player_id}-{season}")
+    team_id = rng.choice(list(NBA_TEAMS))
+    opponents = [team for team in NBA_TEAMS if team != team_id]
+    day = date(season - 1, 10, 20)
+    rows = []
+    for game in range(1, games + 1):
+        day += timedelta(days=rng.randint(1, 3))
+        cells = (
+            f'<th data-stat="ranker">{game}</th><td data-stat="date_game">{day.isoformat()}</td>'
+            f'<td data-stat="team_id">{team_id}</td>'
+            f'<td data-stat="game_location">{rng.choice(["", "@"])}</td>'
+            f'<td data-stat="opp_id">{rng.choice(opponents)}</td>'
+        )
+        if game % 20 == 0:
+            rows.append(f'<tr>{cells}<td data-stat="reason" colspan="22">Did Not Play</td></tr>')
+            continue
+        fga, fg3a, fta = rng.randint(3, 25), rng.randint(0, 10), rng.randint(0, 10)
+        fg3 = rng.randint(0, fg3a)
+        fg = min(fga, fg3 + rng.randint(0, max(fga - fg3a, 0)))
+        ft = rng.randint(0, fta)
+        orb, drb = rng.randint(0, 5), rng.randint(0, 10)
+        margin = rng.randint(-20, 20) or 1
+        stats = {
+            'game_result': f"{'W' if margin > 0 else 'L'} ({margin:+d})", 'gs': rng.choice(['1', '0']),
+            'mp': f"{rng.randint(10, 42)}:{rng.randint(0, 59):02d}", 'fg': fg, 'fga': fga,
+            'fg3': fg3, 'fg3a': fg3a, 'ft': ft, 'fta': fta, 'orb': orb, 'drb': drb, 'trb': orb + drb,
+            'ast': rng.randint(0, 12), 'stl': rng.randint(0, 4), 'blk': rng.randint(0, 4),
+            'tov': rng.randint(0, 6), 'pf': rng.randint(0, 6), 'pts': 2 * fg + fg3 + ft,
+            'plus_minus': f"{rng.randint(-25, 25):+d}"
+        }
+        cells += ''.join(f'<td data-stat="{key}">{value}</td>' for key, value in stats.items())
+        rows.append(f'<tr>{cells}</tr>')
+    return (
+        f'<html><body><h1>{player_id} {season - 1}-{str(season)[2:]} Game Log</h1>'
+        '<table id="pgl_basic"><thead><tr><th>Rk</th><th>Date</th></tr></thead>'
+        f'<tbody>{"".join(rows)}</tbody></table></body></html>'
+    ).encode('utf-8')
+
+def _game_log(path: str) -> Optional[Tuple[str, int]]:
+    parts = path.strip('/').split('/')
+    if len(parts) == 5 and parts[0] == 'players' and parts[3] == 'gamelog':
+        try:
+            return parts[2], int(parts[4])
+        except ValueError:
+            return None
+    return None
+
+def _team_season(path: str) -> Optional[Tuple[str, int]]:
+    parts = path.strip('/').split('/')
+    if len(parts) == 3 and parts[0] == 'teams' and parts[2].endswith('.html'):
+        try:
+            return parts[1], int(parts[2][:-len('.html')])
+        except ValueError:
+            return None
+    return None
+
+class FixtureServer(ThreadingHTTPServer):
+    """
+    Local stand-in for basketball-reference.com serving recorded pages.
+    Team season and game log pages that were never recorded are generated
+    with synthetic_page and synthetic_game_log when synthetic is on. Responses carry an ETag and
+    Last-Modified and honour conditional requests like the real site.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, store: FixtureStore, host: str = '127.0.0.1', port: int = 0,
+                 synthetic: bool = True, delay_ms: float = 0):
+        self.store = store
+        self.synthetic = synthetic
+        self.delay = delay_ms / 1000
+        self.started_at = formatdate(usegmt=True)
+        super().__init__((host, port), FixtureHandler)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def page(self, path: str) -> Optional[Tuple[bytes, Dict]]:
+        recorded = self.store.load(path)
+        if recorded is not None:
+            return recorded
+        if not self.synthetic:
+            return None
+        target = _team_season(path)
+        if target is not None:
+            return synthetic_page(*target), {}
+        target = _game_log(path)
+        if target is not None:
+            return synthetic_game_log(*target), {}
+        return None
+
+    def start(self) -> threading.Thread:
+        """Serve from a background thread, for benchmarks and scripts."""
+        thread = threading.Thread(target=self.serve_forever, name='fixture-server', daemon=True)
+        thread.start()
+        return thread
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        page = self.server.page(urlsplit(self.path).path)
+        if page is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body, meta = page
+        etag = meta.get('etag') or f'"{hashlib.sha1(body).hexdigest()}"'
+        last_modified = meta.get('last_modified') or self.server.started_at
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Record basketball-reference pages and replay them offline")
+    parser.add_argument('--dir', default=None, help="fixture directory (default FIXTURE_DIR or fixtures/)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    recorder = commands.add_parser('record', help="fetch team season pages and save them as fixtures")
+    recorder.add_argument('--teams', nargs='+', default=['LAL'])
+    recorder.add_argument('--seasons', nargs='+', type=int, default=[2024])
+
+    server = commands.add_parser('serve', help="serve fixtures as a local stand-in for the site")
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--port', type=int, default=8765)
+    server.add_argument('--no-synthetic', action='store_true',
+                        help="return 404 for team seasons that were not recorded")
+    server.add_argument('--delay-ms', type=float, default=0, help="latency added to every response")
+    args = parser.parse_args()
+
+    store = FixtureStore(args.dir)
+    if args.command == 'record':
+        scraper = LakersDataScraper(base_url=LIVE_BASE_URL)
+        record(scraper, store)
+        for season in args.seasons:
+            for team_id in args.teams:
+                # Through the fetcher, so recording keeps to the site's rate limit and backs off like a run
+                response = scraper.fetcher.get(scraper.team_url(team_id, season), scraper.headers)
+                response.raise_for_status()
+    else:
+        httpd = FixtureServer(store, args.host, args.port, not args.no_synthetic, args.delay_ms)
+        logger.info(f"Serving fixtures from {store.directory} on {httpd.base_url} "
+                    f"(point the ETL at it with SCRAPER_BASE_URL={httpd.base_url})")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import json
+import logging
+import threading
+import time
+from atomic import write_atomic
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+class RunMetrics:
+    """Collect per-stage timings and counters for one pipeline run.
+
+    Stages are timed with timer() and counters are bumped with add(), both
+    safe to call from the pipeline's worker threads. The totals are written
+    out as a JSON run report and as a Prometheus textfile.
+    """
+
+    def __init__(self, prefix: str = 'nba_etl'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Start collecting for a new run."""
+        with self._lock:
+            self.started_at = datetime.now()
+            self._start = time.perf_counter()
+            self.stages = {}
+            self.counters = {}
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Time a block of work as one call of a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                timing = self.stages.setdefault(stage, {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+                timing['calls'] += 1
+                timing['total_seconds'] += elapsed
+                timing['max_seconds'] = max(timing['max_seconds'], elapsed)
+
+    def add(self, name: str, value: float = 1, table: str = None) -> None:
+        """Add to a counter, optionally broken down by table."""
+        with self._lock:
+            self.counters[(name, table)] = self.counters.get((name, table), 0) + value
+
+    def set(self, name: str, value: float) -> None:
+        with self._lock:
+            self.counters[(name, None)] = value
+
+    def state(self) -> Dict:
+        """Return the raw timings and counters, for merging into another collector."""
+        with self._lock:
+            return {
+                'stages': {stage: dict(timing) for stage, timing in self.stages.items()},
+                'counters': dict(self.counters)
+            }
+
+    def merge(self, state: Dict) -> None:
+        """Add timings and counters collected elsewhere, such as in a parse worker process."""
+        with self._lock:
+            for stage, timing in state['stages'].items():
+                total = self.stages.setdefault(stage, {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+                total['calls'] += timing['calls']
+                total['total_seconds'] += timing['total_seconds']
+                total['max_seconds'] = max(total['max_seconds'], timing['max_seconds'])
+            for key, value in state['counters'].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def report(self) -> Dict:
+        """Return the run's timings and counters as a JSON-ready dict."""
+        with self._lock:
+            counters = {}
+            for (name, table), value in sorted(self.counters.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+                if table is None:
+                    counters[name] = value
+                else:
+                    counters.setdefault(name, {})[table] = value
+            stages = {
+                stage: {**timing, 'mean_seconds': timing['total_seconds'] / timing['calls']}
+                for stage, timing in self.stages.items()
+            }
+            return {
+                'started_at': self.started_at.isoformat(),
+                'duration_seconds': time.perf_counter() - self._start,
+                'stages': stages,
+                'counters': counters
+            }
+
+    def summary(self) -> str:
+        """One-line summary of where the run's time went."""
+        report = self.report()
+        stages = ', '.join(
+            f"{stage} {timing['total_seconds']:.2f}s/{timing['calls']}"
+            for stage, timing in report['stages'].items()
+        )
+        return f"Run took {report['duration_seconds']:.2f}s ({stages or 'no stages'})"
+
+    def write_json(self, path: str) -> None:
+        """Write the run report as JSON."""
+        write_atomic(path, json.dumps(self.report(), indent=2))
+        logger.info(f"Wrote run report to {path}")
+
+    def write_prometheus(self, path: str) -> None:
+        """Write the run report in the Prometheus textfile collector format."""
+        report = self.report()
+        lines = []
+
+        def metric(name: str, help_text: str, samples: Dict) -> None:
+            full_name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} gauge")
+            for labels, value in samples.items():
+                label_text = ','.join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f"{full_name}{{{label_text}}} {value}" if label_text else f"{full_name} {value}")
+
+        metric('run_timestamp_seconds', "Start time of the last run.",
+               {(): self.started_at.timestamp()})
+        metric('run_duration_seconds', "Wall time of the last run.",
+               {(): report['duration_seconds']})
+        for field, help_text in [('total_seconds', "Time spent in each stage during the last run."),
+                                 ('max_seconds', "Slowest single call of each stage during the last run."),
+                                 ('calls', "Calls of each stage during the last run.")]:
+            metric(f"stage_{field}", help_text, {
+                (('stage', stage),): timing[field] for stage, timing in report['stages'].items()
+            })
+        for name, value in report['counters'].items():
+            if isinstance(value, dict):
+                samples = {(('table', table),): count for table, count in value.items()}
+            else:
+                samples = {(): value}
+            metric(name, f"{name.replace('_', ' ').capitalize()} during the last run.", samples)
+
+        write_atomic(path, '\n'.join(lines) + '\n')
+        logger.info(f"Wrote Prometheus metrics to {path}")
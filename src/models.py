@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, ForeignKeyConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -7,9 +7,10 @@ Base = declarative_base()
 class Team(Base):
     __tablename__ = 'teams'
 
+    # One row per team season
     team_id = Column(String, primary_key=True)
+    year = Column(Integer, primary_key=True)
     name = Column(String)
-    year = Column(Integer)
     wins = Column(Integer)
     losses = Column(Integer)
     last_updated = Column(DateTime)
@@ -18,7 +19,9 @@ class Player(Base):
     __tablename__ = 'players'
 
     player_id = Column(String, primary_key=True)
-    team_id = Column(String, ForeignKey('teams.team_id'))
+    # Team and season of the latest roster the player was loaded from
+    team_id = Column(String)
+    season = Column(Integer)
     name = Column(String)
     number = Column(String)
     position = Column(String)
@@ -29,12 +32,29 @@ class Player(Base):
     experience = Column(String)
     college = Column(String)
 
+class TeamRoster(Base):
+    __tablename__ = 'team_rosters'
+    __table_args__ = (
+        ForeignKeyConstraint(['team_id', 'season'], ['teams.team_id', 'teams.year']),
+        Index('ix_team_rosters_player', 'player_id', 'season'),
+    )
+
+    team_id = Column(String, primary_key=True)
+    season = Column(Integer, primary_key=True)
+    player_id = Column(String, ForeignKey('players.player_id'), primary_key=True)
+    number = Column(String)
+    position = Column(String)
+
 class PlayerStats(Base):
     __tablename__ = 'player_stats'
+    __table_args__ = (
+        Index('ix_player_stats_player_team_season', 'player_id', 'team_id', 'season', unique=True),
+        ForeignKeyConstraint(['team_id', 'season'], ['teams.team_id', 'teams.year']),
+    )
 
     id = Column(Integer, primary_key=True)
     player_id = Column(String, ForeignKey('players.player_id'))
-    team_id = Column(String, ForeignKey('teams.team_id'))
+    team_id = Column(String)
     season = Column(Integer)
     games_played = Column(Integer)
     games_started = Column(Integer)
@@ -48,7 +68,123 @@ class PlayerStats(Base):
     two_pointers = Column(Float)
     two_point_attempts = Column(Float)
     two_point_percentage = Column(Float)
+    free_throws = Column(Float)
+    free_throw_attempts = Column(Float)
+    free_throw_percentage = Column(Float)
     points_per_game = Column(Float)
     rebounds_per_game = Column(Float)
     assists_per_game = Column(Float)
+    content_hash = Column(String)
     last_updated = Column(DateTime, default=datetime.now)
+
+class PlayerStatsHistory(Base):
+    __tablename__ = 'player_stats_history'
+    __table_args__ = (
+        Index('ix_player_stats_history_player_season', 'player_id', 'season', 'snapshot_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    player_id = Column(String)
+    team_id = Column(String)
+    season = Column(Integer)
+    games_played = Column(Integer)
+    games_started = Column(Integer)
+    minutes_played = Column(Float)
+    field_goals = Column(Float)
+    field_goal_attempts = Column(Float)
+    field_goal_percentage = Column(Float)
+    three_pointers = Column(Float)
+    three_point_attempts = Column(Float)
+    three_point_percentage = Column(Float)
+    two_pointers = Column(Float)
+    two_point_attempts = Column(Float)
+    two_point_percentage = Column(Float)
+    free_throws = Column(Float)
+    free_throw_attempts = Column(Float)
+    free_throw_percentage = Column(Float)
+    points_per_game = Column(Float)
+    rebounds_per_game = Column(Float)
+    assists_per_game = Column(Float)
+    content_hash = Column(String)
+    snapshot_at = Column(DateTime, default=datetime.now)
+
+class DataVersion(Base):
+    __tablename__ = 'data_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.now)
+
+class PlayerProfile(Base):
+    __tablename__ = 'player_profiles'
+
+    player_id = Column(String, primary_key=True)
+    team_id = Column(String, index=True)
+    height_inches = Column(Integer)
+    weight_lbs = Column(Integer)
+    computed_at = Column(DateTime, default=datetime.now)
+
+class PlayerSeasonMetrics(Base):
+    __tablename__ = 'player_season_metrics'
+    __table_args__ = (
+        Index('ix_player_season_metrics_season_team', 'season', 'team_id'),
+        Index('ix_player_season_metrics_season_points', 'season', 'points_per_game'),
+    )
+
+    player_id = Column(String, primary_key=True)
+    team_id = Column(String, primary_key=True)
+    season = Column(Integer, primary_key=True)
+    points_per_game = Column(Float)
+    true_shooting_percentage = Column(Float)
+    effective_field_goal_percentage = Column(Float)
+    points_per_36 = Column(Float)
+    rebounds_per_36 = Column(Float)
+    assists_per_36 = Column(Float)
+    points_team_percentile = Column(Float)
+    points_league_percentile = Column(Float)
+    true_shooting_league_percentile = Column(Float)
+    points_per_36_league_percentile = Column(Float)
+    computed_at = Column(DateTime, default=datetime.now)
+
+class PlayerGameLog(Base):
+    __tablename__ = 'player_game_logs'
+    __table_args__ = (
+        Index('ix_player_game_logs_season_team', 'season', 'team_id'),
+        Index('ix_player_game_logs_player_season', 'player_id', 'season'),
+        # PostgreSQL keeps one partition per season, created by DatabaseManager
+        {'postgresql_partition_by': 'LIST (season)'},
+    )
+
+    season = Column(Integer, primary_key=True)
+    player_id = Column(String, primary_key=True)
+    game_date = Column(Date, primary_key=True)
+    team_id = Column(String)
+    opponent_id = Column(String)
+    is_home = Column(Integer)
+    result = Column(String)
+    started = Column(Integer)
+    minutes = Column(Float)
+    field_goals = Column(Integer)
+    field_goal_attempts = Column(Integer)
+    three_pointers = Column(Integer)
+    three_point_attempts = Column(Integer)
+    free_throws = Column(Integer)
+    free_throw_attempts = Column(Integer)
+    offensive_rebounds = Column(Integer)
+    defensive_rebounds = Column(Integer)
+    rebounds = Column(Integer)
+    assists = Column(Integer)
+    steals = Column(Integer)
+    blocks = Column(Integer)
+    turnovers = Column(Integer)
+    personal_fouls = Column(Integer)
+    points = Column(Integer)
+    plus_minus = Column(Integer)
+    last_updated = Column(DateTime, default=datetime.now)
+
+class BackfillCheckpoint(Base):
+    __tablename__ = 'backfill_checkpoints'
+
+    team_id = Column(String, primary_key=True)
+    season = Column(Integer, primary_key=True)
+    completed_at = Column(DateTime, default=datetime.now)
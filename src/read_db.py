@@ -1,14 +1,14 @@
-import sqlite3
 import pandas as pd
 from tabulate import tabulate
 import os
+from storage import connect_readonly
 
 def read_database():
     # Get the absolute path to the database file
     db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'nba_data.db')
     
-    # Connect to the SQLite database
-    conn = sqlite3.connect(db_path)
+    # Connect to the SQLite database, read-only so a running ETL load is not blocked
+    conn = connect_readonly(db_path)
     
     # Read teams table
     print("\n=== LAKERS TEAM INFO ===")
@@ -34,10 +34,29 @@ def read_database():
             ps.three_point_percentage
         FROM player_stats ps
         JOIN players p ON ps.player_id = p.player_id
-        ORDER BY CAST(ps.points_per_game AS FLOAT) DESC
+        ORDER BY ps.points_per_game DESC
     """, conn)
     print(tabulate(stats_df, headers='keys', tablefmt='pretty', showindex=False))
     
+    # Read derived metrics table, filled in by the ETL after each load
+    print("\n=== LAKERS ADVANCED METRICS ===")
+    try:
+        metrics_df = pd.read_sql_query("""
+            SELECT 
+                p.name,
+                m.season,
+                m.true_shooting_percentage,
+                m.effective_field_goal_percentage,
+                m.points_per_36,
+                m.points_league_percentile
+            FROM player_season_metrics m
+            JOIN players p ON m.player_id = p.player_id
+            ORDER BY m.season DESC, m.points_per_game DESC
+        """, conn)
+        print(tabulate(metrics_df, headers='keys', tablefmt='pretty', showindex=False, floatfmt='.3f'))
+    except pd.errors.DatabaseError:
+        print("No derived metrics yet. Run the ETL pipeline to compute them.")
+    
     # Close the connection
     conn.close()
 
@@ -0,0 +1,176 @@
+import pandas as pd
+from sqlalchemy import Date, DateTime, Float, Integer
+from typing import Dict, List, Union
+from models import Player, PlayerGameLog, PlayerStats
+
+# basketball-reference table headers for each model column
+ROSTER_COLUMNS = {
+    'Player': 'name',
+    'No.': 'number',
+    'Pos': 'position',
+    'Ht': 'height',
+    'Wt': 'weight',
+    'College': 'college'
+}
+
+STATS_COLUMNS = {
+    'G': 'games_played',
+    'GS': 'games_started',
+    'MP': 'minutes_played',
+    'FG': 'field_goals',
+    'FGA': 'field_goal_attempts',
+    'FG%': 'field_goal_percentage',
+    '3P': 'three_pointers',
+    '3PA': 'three_point_attempts',
+    '3P%': 'three_point_percentage',
+    '2P': 'two_pointers',
+    '2PA': 'two_point_attempts',
+    '2P%': 'two_point_percentage',
+    'FT': 'free_throws',
+    'FTA': 'free_throw_attempts',
+    'FT%': 'free_throw_percentage',
+    'PTS': 'points_per_game',
+    'TRB': 'rebounds_per_game',
+    'AST': 'assists_per_game'
+}
+
+STAT_FIELDS = list(STATS_COLUMNS.values())
+
+# Left blank for players without attempts, stored as 0
+ZERO_FILLED_STAT_FIELDS = ['field_goal_percentage', 'three_point_percentage',
+                           'two_point_percentage', 'free_throw_percentage']
+
+# Game log cells by data-stat attribute; the site renamed several in its
+# 2025 redesign, so both spellings map to the same column
+GAME_LOG_COLUMNS = {
+    'date_game': 'game_date',
+    'date': 'game_date',
+    'team_id': 'team_id',
+    'team_name_abbr': 'team_id',
+    'game_location': 'is_home',
+    'opp_id': 'opponent_id',
+    'opp_name_abbr': 'opponent_id',
+    'game_result': 'result',
+    'gs': 'started',
+    'is_starter': 'started',
+    'mp': 'minutes',
+    'fg': 'field_goals',
+    'fga': 'field_goal_attempts',
+    'fg3': 'three_pointers',
+    'fg3a': 'three_point_attempts',
+    'ft': 'free_throws',
+    'fta': 'free_throw_attempts',
+    'orb': 'offensive_rebounds',
+    'drb': 'defensive_rebounds',
+    'trb': 'rebounds',
+    'ast': 'assists',
+    'stl': 'steals',
+    'blk': 'blocks',
+    'tov': 'turnovers',
+    'pf': 'personal_fouls',
+    'pts': 'points',
+    'plus_minus': 'plus_minus'
+}
+
+def column_dtypes(model) -> Dict[str, str]:
+    """Map each model column to the pandas dtype its values are kept in"""
+    dtypes = {}
+    for column in model.__table__.columns:
+        if isinstance(column.type, Integer):
+            dtypes[column.name] = 'Int64'
+        elif isinstance(column.type, Float):
+            dtypes[column.name] = 'float64'
+        elif isinstance(column.type, DateTime):
+            dtypes[column.name] = 'datetime64[ns]'
+        elif isinstance(column.type, Date):
+            dtypes[column.name] = 'date'
+        else:
+            dtypes[column.name] = 'object'
+    return dtypes
+
+def coerce_frame(df: pd.DataFrame, model) -> pd.DataFrame:
+    """
+    Cast a frame's columns to the types of the model's columns, a whole
+    column at a time. Number cells may be text with a trailing '%';
+    blanks and anything unparseable become null.
+    """
+    dtypes = column_dtypes(model)
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        dtype = dtypes.get(name)
+        if dtype in ('Int64', 'float64'):
+            if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+                series = series.astype('string').str.strip().str.rstrip('%')
+            series = pd.to_numeric(series, errors='coerce').astype('float64')
+            if dtype == 'Int64':
+                series = series.round().astype('Int64')
+        elif dtype == 'datetime64[ns]':
+            series = pd.to_datetime(series, errors='coerce')
+        elif dtype == 'date':
+            series = pd.to_datetime(series, errors='coerce')
+            series = series.dt.date.astype(object).where(series.notna(), None)
+        elif dtype == 'object':
+            if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+                series = series.astype('string').str.strip().replace('', pd.NA)
+            series = series.astype(object).where(series.notna(), None)
+        columns[name] = series
+    return pd.DataFrame(columns, index=df.index)
+
+def as_frame(rows: Union[pd.DataFrame, List[Dict], None], model) -> pd.DataFrame:
+    """Accept a frame or a list of record dicts and return a frame typed for model"""
+    if rows is None:
+        rows = []
+    if not isinstance(rows, pd.DataFrame):
+        rows = pd.DataFrame.from_records(rows)
+    return coerce_frame(rows, model)
+
+def roster_frame(columns: Dict[str, List], team_id: str, season: int) -> pd.DataFrame:
+    """Build a typed players frame for a team season from a roster table's raw text columns"""
+    rows = len(columns.get('player_id', []))
+    df = pd.DataFrame({
+        'player_id': columns.get('player_id', []),
+        **{column: columns.get(header, [None] * rows) for header, column in ROSTER_COLUMNS.items()}
+    })
+    df.insert(1, 'team_id', team_id)
+    df.insert(2, 'season', season)
+    return coerce_frame(df, Player)
+
+def stats_frame(columns: Dict[str, List], team_id: str, season: int) -> pd.DataFrame:
+    """Build a typed player_stats frame from a per-game stats table's raw text columns"""
+    rows = len(columns.get('player_id', []))
+    df = pd.DataFrame({
+        'player_id': columns.get('player_id', []),
+        **{column: columns.get(header, [None] * rows) for header, column in STATS_COLUMNS.items()}
+    })
+    df.insert(1, 'team_id', team_id)
+    df.insert(2, 'season', season)
+    df = coerce_frame(df, PlayerStats)
+    df[ZERO_FILLED_STAT_FIELDS] = df[ZERO_FILLED_STAT_FIELDS].fillna(0.0)
+    df['last_updated'] = pd.Timestamp.now()
+    return df
+
+def game_log_frame(columns: Dict[str, List], player_id: str, season: int) -> pd.DataFrame:
+    """Build a typed player_game_logs frame from a game log table's raw text columns"""
+    rows = len(next(iter(columns.values()), []))
+    df = pd.DataFrame({'season': [season] * rows, 'player_id': [player_id] * rows})
+    for stat, column in GAME_LOG_COLUMNS.items():
+        if stat in columns and column not in df.columns:
+            df[column] = columns[stat]
+    df = df.reindex(columns=[column.name for column in PlayerGameLog.__table__.columns
+                             if column.name != 'last_updated'])
+    
+    # Cells that are not plain numbers: '@' marks away games, '*' or 1 a start, '34:12' minutes
+    df['is_home'] = (df['is_home'].fillna('').astype(str).str.strip() != '@').astype(int)
+    df['started'] = df['started'].fillna('').astype(str).str.strip().isin(['1', '*']).astype(int)
+    minutes = df['minutes'].astype('string').str.extract(r'^(\d+):(\d+)$').astype(float)
+    df['minutes'] = (minutes[0] + minutes[1] / 60).round(2)
+    df['plus_minus'] = df['plus_minus'].astype('string').str.lstrip('+')
+    
+    df = coerce_frame(df, PlayerGameLog)
+    df['last_updated'] = pd.Timestamp.now()
+    return df[df['game_date'].notna()]
+
+def frame_records(df: pd.DataFrame) -> List[Dict]:
+    """Turn a frame into insert rows with plain Python values and NULLs"""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
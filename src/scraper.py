@@ -1,163 +1,694 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import hashlib
+import itertools
 import logging
-from typing import Dict, List
-import pandas as pd
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
 import re
-from io import StringIO
+from archive import PageArchive
+from fetcher import CircuitOpenError, FetchError, Fetcher
+from metrics import RunMetrics
+
+# lxml and pandas (through schema) are imported when a page is first parsed,
+# so fetching and change checks start without them
+if TYPE_CHECKING:
+    import lxml.html
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+NBA_TEAMS = {
+    'ATL': 'Atlanta Hawks',
+    'BOS': 'Boston Celtics',
+    'BRK': 'Brooklyn Nets',
+    'CHO': 'Charlotte Hornets',
+    'CHI': 'Chicago Bulls',
+    'CLE': 'Cleveland Cavaliers',
+    'DAL': 'Dallas Mavericks',
+    'DEN': 'Denver Nuggets',
+    'DET': 'Detroit Pistons',
+    'GSW': 'Golden State Warriors',
+    'HOU': 'Houston Rockets',
+    'IND': 'Indiana Pacers',
+    'LAC': 'Los Angeles Clippers',
+    'LAL': 'Los Angeles Lakers',
+    'MEM': 'Memphis Grizzlies',
+    'MIA': 'Miami Heat',
+    'MIL': 'Milwaukee Bucks',
+    'MIN': 'Minnesota Timberwolves',
+    'NOP': 'New Orleans Pelicans',
+    'NYK': 'New York Knicks',
+    'OKC': 'Oklahoma City Thunder',
+    'ORL': 'Orlando Magic',
+    'PHI': 'Philadelphia 76ers',
+    'PHO': 'Phoenix Suns',
+    'POR': 'Portland Trail Blazers',
+    'SAC': 'Sacramento Kings',
+    'SAS': 'San Antonio Spurs',
+    'TOR': 'Toronto Raptors',
+    'UTA': 'Utah Jazz',
+    'WAS': 'Washington Wizards'
+}
+
+# basketball-reference abbreviation each franchise used from a season on,
+# newest first; None marks seasons the franchise did not play
+FRANCHISE_HISTORY = {
+    'ATL': [(1969, 'ATL'), (1956, 'STL'), (1952, 'MLH'), (1950, 'TRI')],
+    'BOS': [(1947, 'BOS')],
+    'BRK': [(2013, 'BRK'), (1978, 'NJN'), (1977, 'NYN')],
+    'CHO': [(2015, 'CHO'), (2005, 'CHA'), (2003, None), (1989, 'CHH')],
+    'CHI': [(1967, 'CHI')],
+    'CLE': [(1971, 'CLE')],
+    'DAL': [(1981, 'DAL')],
+    'DEN': [(1977, 'DEN')],
+    'DET': [(1958, 'DET'), (1949, 'FTW')],
+    'GSW': [(1972, 'GSW'), (1963, 'SFW'), (1947, 'PHW')],
+    'HOU': [(1972, 'HOU'), (1968, 'SDR')],
+    'IND': [(1977, 'IND')],
+    'LAC': [(1985, 'LAC'), (1979, 'SDC'), (1971, 'BUF')],
+    'LAL': [(1961, 'LAL'), (1949, 'MNL')],
+    'MEM': [(2002, 'MEM'), (1996, 'VAN')],
+    'MIA': [(1989, 'MIA')],
+    'MIL': [(1969, 'MIL')],
+    'MIN': [(1990, 'MIN')],
+    'NOP': [(2014, 'NOP'), (2008, 'NOH'), (2006, 'NOK'), (2003, 'NOH')],
+    'NYK': [(1947, 'NYK')],
+    'OKC': [(2009, 'OKC'), (1968, 'SEA')],
+    'ORL': [(1990, 'ORL')],
+    'PHI': [(1964, 'PHI'), (1950, 'SYR')],
+    'PHO': [(1969, 'PHO')],
+    'POR': [(1971, 'POR')],
+    'SAC': [(1986, 'SAC'), (1976, 'KCK'), (1973, 'KCO'), (1958, 'CIN'), (1949, 'ROC')],
+    'SAS': [(1977, 'SAS')],
+    'TOR': [(1996, 'TOR')],
+    'UTA': [(1980, 'UTA'), (1975, 'NOJ')],
+    'WAS': [(1998, 'WAS'), (1975, 'WSB'), (1974, 'CAP'), (1964, 'BAL'), (1963, 'CHZ'), (1962, 'CHP')]
+}
+
+# Names of the abbreviations in FRANCHISE_HISTORY that are no longer in use
+HISTORICAL_TEAM_NAMES = {
+    'STL': 'St. Louis Hawks',
+    'MLH': 'Milwaukee Hawks',
+    'TRI': 'Tri-Cities Blackhawks',
+    'NJN': 'New Jersey Nets',
+    'NYN': 'New York Nets',
+    'CHA': 'Charlotte Bobcats',
+    'CHH': 'Charlotte Hornets',
+    'FTW': 'Fort Wayne Pistons',
+    'SFW': 'San Francisco Warriors',
+    'PHW': 'Philadelphia Warriors',
+    'SDR': 'San Diego Rockets',
+    'SDC': 'San Diego Clippers',
+    'BUF': 'Buffalo Braves',
+    'MNL': 'Minneapolis Lakers',
+    'VAN': 'Vancouver Grizzlies',
+    'NOH': 'New Orleans Hornets',
+    'NOK': 'New Orleans/Oklahoma City Hornets',
+    'SEA': 'Seattle SuperSonics',
+    'SYR': 'Syracuse Nationals',
+    'KCK': 'Kansas City Kings',
+    'KCO': 'Kansas City-Omaha Kings',
+    'CIN': 'Cincinnati Royals',
+    'ROC': 'Rochester Royals',
+    'NOJ': 'New Orleans Jazz',
+    'WSB': 'Washington Bullets',
+    'CAP': 'Capital Bullets',
+    'BAL': 'Baltimore Bullets',
+    'CHZ': 'Chicago Zephyrs',
+    'CHP': 'Chicago Packers'
+}
+
+LIVE_BASE_URL = "https://www.basketball-reference.com"
+
+PLAYER_HREF_PATTERN = re.compile(r'/players/\w/([^/.]+)\.html')
+
+def season_team_id(team_id: str, season: int) -> Optional[str]:
+    """Return the abbreviation a franchise played a season under, or None if it did not play it."""
+    for first_season, abbreviation in FRANCHISE_HISTORY.get(team_id, [(0, team_id)]):
+        if season >= first_season:
+            return abbreviation
+    return None
+
+def team_name(team_id: str) -> str:
+    """Return the name a team played under, current or historical, or the abbreviation if unknown."""
+    return NBA_TEAMS.get(team_id) or HISTORICAL_TEAM_NAMES.get(team_id, team_id)
+
+def find_table(doc: "lxml.html.HtmlElement", table_id: str) -> Optional["lxml.html.HtmlElement"]:
+    """Find a table by id, including the ones basketball-reference hides in comments."""
+    import lxml.html
+    tables = doc.xpath('//table[@id=$table_id]', table_id=table_id)
+    if tables:
+        return tables[0]
+    for comment in doc.xpath('//comment()[contains(., $table_id)]', table_id=table_id):
+        fragment = lxml.html.fragment_fromstring(comment.text, create_parent='div')
+        tables = fragment.xpath('.//table[@id=$table_id]', table_id=table_id)
+        if tables:
+            return tables[0]
+    return None
+
+def _table_rows(table: "lxml.html.HtmlElement") -> Tuple[List[str], Iterator[Tuple[str, List[str]]]]:
+    """Return a table's column headers and an iterator of (player_id, cell texts) rows."""
+    header_rows = table.xpath('./thead/tr')
+    if not header_rows:
+        return [], iter(())
+    headers = [cell.text_content().strip() for cell in header_rows[-1] if cell.tag in ('th', 'td')]
+
+    def rows():
+        for tr in table.xpath('./tbody/tr'):
+            # basketball-reference repeats the header inside long tables
+            if 'thead' in (tr.get('class') or '').split():
+                continue
+            
+            texts = []
+            player_id = None
+            for cell in tr:
+                if cell.tag not in ('th', 'td'):
+                    continue
+                texts.append(cell.text_content())
+                
+                if player_id is None:
+                    player_id = cell.get('data-append-csv')
+                    if player_id is None:
+                        for href in cell.xpath('./a/@href'):
+                            match = PLAYER_HREF_PATTERN.search(href)
+                            if match:
+                                player_id = match.group(1)
+                                break
+            
+            if player_id:
+                yield player_id, texts[:len(headers)]
+    return headers, rows()
+
+def extract_columns(table: "lxml.html.HtmlElement") -> Dict[str, List[str]]:
+    """Walk a stats table once, returning its raw cell text column by column.
+
+    Columns are keyed by header text plus 'player_id'. Rows without a player
+    are skipped, and repeated header rows too. Values are left as text for
+    schema.coerce_frame to convert a whole column at a time.
+    """
+    headers, table_rows = _table_rows(table)
+    columns = {header: [] for header in headers}
+    player_ids = []
+    for player_id, texts in table_rows:
+        player_ids.append(player_id)
+        texts = texts + [None] * (len(headers) - len(texts))
+        for header, text in zip(headers, texts):
+            columns[header].append(text)
+    columns['player_id'] = player_ids
+    return columns
+
+def extract_stat_columns(table: "lxml.html.HtmlElement") -> Dict[str, List[Optional[str]]]:
+    """Walk a game log table once, returning raw cell text keyed by data-stat.
+
+    Repeated header rows and games the player missed (rows carrying a
+    'reason' cell such as Did Not Play) are skipped.
+    """
+    rows = []
+    for tr in table.xpath('./tbody/tr'):
+        if 'thead' in (tr.get('class') or '').split():
+            continue
+        row = {cell.get('data-stat'): cell.text_content().strip() or None
+               for cell in tr if cell.tag in ('th', 'td') and cell.get('data-stat')}
+        if row and 'reason' not in row:
+            rows.append(row)
+    stats = {stat for row in rows for stat in row}
+    return {stat: [row.get(stat) for row in rows] for stat in stats}
+
+class PageCache:
+    """Fetch and parse each URL at most once, sharing the parsed tree.
+
+    Validators (ETag, Last-Modified and a content hash) are kept across runs
+    so has_changed can tell whether a page moved since it was last fetched.
+    With an archive, every downloaded page is stored in it, pages it already
+    holds are revalidated with a conditional GET and read back from it when
+    the server answers 304, and offline mode reads pages from it only.
+    """
+
+    def __init__(self, session: requests.Session, headers: Dict = None, metrics: RunMetrics = None,
+                 fetcher: Fetcher = None, archive: PageArchive = None):
+        self.session = session
+        self.headers = headers or {}
+        self.metrics = metrics or RunMetrics()
+        self.fetcher = fetcher or Fetcher(session, self.metrics)
+        self.archive = archive
+        self.offline = False
+        self._documents = {}
+        # URLs parsed ahead of their first use, which is not a cache hit
+        self._primed = set()
+        self._bodies = {}
+        self._validators = {}
+        self._url_locks = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'fetches': 0,
+            'parses': 0,
+            'fetches_saved': 0,
+            'parses_saved': 0,
+            'unchanged': 0
+        }
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def _validators_for(self, url: str) -> Dict:
+        validators = self._validators.get(url)
+        if validators is None and self.archive is not None:
+            # Validators from earlier runs are kept in the archive
+            validators = self.archive.latest(url)
+        return validators or {}
+
+    def _read_archived(self, url: str) -> bytes:
+        record = self.archive.latest(url) if self.archive is not None else None
+        if record is None:
+            raise FetchError(f"{url} is not in the page archive")
+        with self.metrics.timer('fetch'):
+            body = self.archive.read(record['content_hash'])
+        self._count('fetches')
+        self.metrics.add('bytes_read_from_archive', len(body))
+        return body
+
+    def _download(self, url: str, conditional: bool = False) -> Optional[bytes]:
+        """Download a page body, or return None if a conditional fetch found it unchanged."""
+        if self.offline:
+            return self._read_archived(url)
+        headers = dict(self.headers)
+        validators = self._validators_for(url)
+        revalidate = conditional or self.archive is not None
+        if revalidate:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        
+        with self.metrics.timer('fetch'):
+            response = self.fetcher.get(url, headers)
+            content = response.content
+        self._count('fetches')
+        self.metrics.add('bytes_downloaded', len(content))
+        if revalidate and response.status_code == 304:
+            self._validators[url] = validators
+            if conditional:
+                return None
+            self.metrics.add('pages_not_modified')
+            try:
+                return self.archive.read(validators['content_hash'])
+            except FileNotFoundError:
+                # The archived copy is gone, so fetch the page again in full
+                self._validators.pop(url, None)
+                return self._download(url)
+        response.raise_for_status()
+        
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        unchanged = conditional and content_hash == validators.get('content_hash')
+        self._validators[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': content_hash
+        }
+        if self.archive is not None:
+            stored = self.archive.put(url, response.content, response.headers, content_hash)
+            self.metrics.add('pages_archived' if stored else 'pages_deduplicated')
+        return None if unchanged else response.content
+
+    def has_changed(self, url: str) -> bool:
+        """Check a page with a conditional GET, keeping the body for the parse if it changed."""
+        with self._url_lock(url):
+            body = self._download(url, conditional=True)
+            if body is None:
+                self._count('unchanged')
+                return False
+            self._bodies[url] = body
+            return True
+
+    def fetch(self, url: str) -> bytes:
+        """Download a page body and hold it until it is parsed."""
+        with self._url_lock(url):
+            if url not in self._bodies:
+                self._bodies[url] = self._download(url)
+            return self._bodies[url]
+
+    def parse(self, url: str, body: bytes = None) -> "lxml.html.HtmlElement":
+        """Parse a fetched page body and cache the tree for the extractors."""
+        with self._url_lock(url):
+            primed = url not in self._documents
+            doc = self._parse(url, body)
+            if primed:
+                self._primed.add(url)
+            return doc
+
+    def _parse(self, url: str, body: bytes = None) -> "lxml.html.HtmlElement":
+        if url in self._documents:
+            self._count('parses_saved')
+            return self._documents[url]
+        
+        if body is None:
+            body = self._bodies.get(url)
+            if body is None:
+                body = self._download(url)
+            else:
+                self._count('fetches_saved')
+        self._bodies.pop(url, None)
+        
+        import lxml.html
+        with self.metrics.timer('parse'):
+            doc = lxml.html.fromstring(body)
+        self._count('parses')
+        
+        self._documents[url] = doc
+        return doc
+
+    def get(self, url: str) -> "lxml.html.HtmlElement":
+        """Return the parsed document for a URL, fetching it on first use."""
+        # Concurrent callers for the same URL wait for the first fetch
+        with self._url_lock(url):
+            if url in self._primed:
+                self._primed.discard(url)
+                return self._documents[url]
+            if url in self._documents:
+                self._count('fetches_saved')
+            return self._parse(url)
+
+    def ensure_parsed(self, url: str) -> None:
+        """Parse a URL's page if it is not cached yet, without counting a cache hit if it is."""
+        with self._url_lock(url):
+            if url not in self._documents:
+                self._parse(url)
+                self._primed.add(url)
+
+    def evict(self, url: str) -> None:
+        """Release the parsed tree for a URL once every extractor is done."""
+        with self._lock:
+            self._documents.pop(url, None)
+            self._primed.discard(url)
+            self._bodies.pop(url, None)
+            self._url_locks.pop(url, None)
+
+    def merge_stats(self, stats: Dict) -> None:
+        """Add the counters of another cache, such as a parse worker process's."""
+        with self._lock:
+            for key, value in stats.items():
+                self.stats[key] += value
+
+    def clear(self) -> None:
+        """Drop cached documents and reset the counters for a new run."""
+        with self._lock:
+            self._documents.clear()
+            self._primed.clear()
+            self._bodies.clear()
+            self._url_locks.clear()
+            for key in self.stats:
+                self.stats[key] = 0
+
 class LakersDataScraper:
-    def __init__(self):
-        """Initialize the Lakers data scraper."""
-        self.base_url = "https://www.basketball-reference.com"
-        self.lakers_url = f"{self.base_url}/teams/LAL/2024.html"
+    def __init__(self, team_id: str = 'LAL', season: int = 2024, pool_size: int = 8,
+                 metrics: RunMetrics = None, base_url: str = None, archive: PageArchive = None):
+        """Initialize the data scraper for a default team and season.
+        
+        Args:
+            team_id: basketball-reference team abbreviation
+            season: season end year (2024 is the 2023-24 season)
+            pool_size: number of keep-alive connections kept in the pool
+            metrics: collector for fetch, parse and transform timings
+            base_url: site to fetch from, defaults to SCRAPER_BASE_URL or basketball-reference.com;
+                point it at a fixtures.py server to run offline. Set SCRAPER_RECORD_DIR
+                to save every fetched page as a fixture.
+            archive: store every fetched page in this archive and revalidate against it
+        """
+        self.base_url = base_url or os.getenv('SCRAPER_BASE_URL', LIVE_BASE_URL)
+        self.team_id = team_id
+        self.season = season
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Firefox/121.0'
         }
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.metrics = metrics or RunMetrics()
+        # Rate limits, retries and the circuit breaker are shared by every fetch
+        self.fetcher = Fetcher(self.session, self.metrics, max_concurrency=pool_size)
+        self.pages = PageCache(self.session, self.headers, self.metrics, self.fetcher, archive)
+        if os.getenv('SCRAPER_RECORD_DIR'):
+            from fixtures import FixtureStore, record
+            record(self, FixtureStore(os.getenv('SCRAPER_RECORD_DIR')), pool_size)
+
+    @property
+    def lakers_url(self) -> str:
+        return self.team_url(self.team_id, self.season)
+
+    def team_url(self, team_id: str, season: int) -> str:
+        """Return the team season page URL."""
+        return f"{self.base_url}/teams/{team_id}/{season}.html"
+
+    def archived_targets(self) -> List[Tuple[str, int]]:
+        """Return the (team, season) targets whose team page is in the archive."""
+        if self.pages.archive is None:
+            return []
+        pattern = re.compile(r'/teams/(\w+)/(\d+)\.html$')
+        targets = []
+        for url in self.pages.archive.urls(f"{self.base_url}/teams/"):
+            match = pattern.search(url)
+            if match:
+                targets.append((match.group(1), int(match.group(2))))
+        return sorted(targets, key=lambda target: (target[1], target[0]))
+
+    def reset(self) -> None:
+        """Start a new run so pages are fetched fresh."""
+        self.pages.clear()
 
-    def get_team_info(self) -> Dict:
-        """Get Lakers team information."""
+    def _target(self, team_id: str, season: int) -> Tuple[str, int]:
+        return team_id or self.team_id, season or self.season
+
+    def get_team_info(self, team_id: str = None, season: int = None) -> Dict:
+        """Get team information for a season."""
+        team_id, season = self._target(team_id, season)
         try:
-            response = requests.get(self.lakers_url, headers=self.headers)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
+            doc = self.pages.get(self.team_url(team_id, season))
+            name = team_name(team_id)
             
             # Find the record in the scoreboard div
-            record_div = soup.find('div', {'class': 'scoreboard'})
-            if record_div:
+            record_divs = doc.xpath('//div[contains(concat(" ", normalize-space(@class), " "), " scoreboard ")]')
+            if record_divs:
                 # Look for text that matches the pattern "XX-XX"
                 record_pattern = re.compile(r'(\d+)-(\d+)')
-                for text in record_div.stripped_strings:
+                for text in record_divs[0].itertext():
                     match = record_pattern.search(text)
                     if match:
                         wins = int(match.group(1))
                         losses = int(match.group(2))
                         
                         team_info = {
-                            'team_id': 'LAL',
-                            'name': 'Los Angeles Lakers',
-                            'year': 2024,
+                            'team_id': team_id,
+                            'name': name,
+                            'year': season,
                             'wins': wins,
                             'losses': losses,
                             'last_updated': datetime.now()
                         }
-                        logger.info("Successfully scraped Lakers team info")
+                        logger.info(f"Successfully scraped {team_id} {season} team info")
                         return team_info
             
             # Fallback to current record if scraping fails
-            team_info = {
-                'team_id': 'LAL',
-                'name': 'Los Angeles Lakers',
-                'year': 2024,
-                'wins': 17,  # Current record as of Dec 27, 2023
-                'losses': 15,
-                'last_updated': datetime.now()
-            }
-            logger.info("Using fallback Lakers team info")
-            return team_info
+            if (team_id, season) == ('LAL', 2024):
+                team_info = {
+                    'team_id': 'LAL',
+                    'name': 'Los Angeles Lakers',
+                    'year': 2024,
+                    'wins': 17,  # Current record as of Dec 27, 2023
+                    'losses': 15,
+                    'last_updated': datetime.now()
+                }
+                logger.info("Using fallback Lakers team info")
+                return team_info
+            
+            logger.error(f"Could not find {team_id} {season} record")
+            return None
             
         except Exception as e:
-            logger.error(f"Error scraping Lakers team info: {str(e)}")
+            logger.error(f"Error scraping {team_id} {season} team info: {str(e)}")
             return None
 
-    def get_roster(self) -> List[Dict]:
-        """Get current Lakers roster information."""
+    def get_roster_frame(self, team_id: str = None, season: int = None) -> "pd.DataFrame":
+        """Get roster information for a team season as a frame typed like the players table."""
+        from schema import roster_frame
+        team_id, season = self._target(team_id, season)
         try:
-            response = requests.get(self.lakers_url, headers=self.headers)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
+            doc = self.pages.get(self.team_url(team_id, season))
             
             # Find the roster table
-            roster_table = soup.find('table', {'id': 'roster'})
-            if not roster_table:
+            roster_table = find_table(doc, 'roster')
+            if roster_table is None:
                 logger.error("Could not find roster table")
-                return []
+                return roster_frame({}, team_id, season)
             
-            # Convert table to pandas DataFrame using StringIO
-            df = pd.read_html(StringIO(str(roster_table)))[0]
-            
-            players = []
-            for _, row in df.iterrows():
-                # Find the player ID from the HTML
-                player_cell = roster_table.find('td', string=row['Player'])
-                if player_cell and player_cell.find('a'):
-                    player_id = player_cell.find('a')['href'].split('/')[-1].replace('.html', '')
-                    
-                    player_info = {
-                        'player_id': player_id,
-                        'name': row['Player'],
-                        'number': str(row['No.']),
-                        'position': row['Pos'],
-                        'height': row['Ht'],
-                        'weight': str(row['Wt']),
-                        'college': row['College']
-                    }
-                    players.append(player_info)
-            
-            logger.info(f"Successfully scraped Lakers roster data. Found {len(players)} players")
+            players = roster_frame(extract_columns(roster_table), team_id, season)
+            self.metrics.add('rows_parsed', len(players), table='roster')
+            logger.info(f"Successfully scraped {team_id} {season} roster data. Found {len(players)} players")
             return players
         except Exception as e:
-            logger.error(f"Error scraping Lakers roster: {str(e)}")
-            return []
+            logger.error(f"Error scraping {team_id} {season} roster: {str(e)}")
+            return roster_frame({}, team_id, season)
 
-    def get_player_stats(self) -> List[Dict]:
-        """Get current season stats for Lakers players."""
+    def get_player_stats_frame(self, team_id: str = None, season: int = None) -> "pd.DataFrame":
+        """Get per-game stats for a team season as a frame typed like the player_stats table."""
+        from schema import stats_frame
+        team_id, season = self._target(team_id, season)
         try:
-            response = requests.get(self.lakers_url, headers=self.headers)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
+            doc = self.pages.get(self.team_url(team_id, season))
             
             # Find the stats table
-            stats_table = soup.find('table', {'id': 'per_game_stats'})
-            if not stats_table:
+            stats_table = find_table(doc, 'per_game_stats')
+            if stats_table is None:
                 logger.error("Could not find stats table")
-                return []
-            
-            # Convert table to pandas DataFrame using StringIO
-            df = pd.read_html(StringIO(str(stats_table)))[0]
+                return stats_frame({}, team_id, season)
             
-            stats = []
-            for _, row in df.iterrows():
-                if pd.isna(row['Player']):  # Skip rows with no player name
-                    continue
-                    
-                # Find the player ID from the HTML
-                player_cell = stats_table.find('td', string=row['Player'])
-                if player_cell and player_cell.find('a'):
-                    player_id = player_cell.find('a')['href'].split('/')[-1].replace('.html', '')
-                    
-                    stats_dict = {
-                        'player_id': player_id,
-                        'team_id': 'LAL',
-                        'season': 2024,
-                        'games_played': str(row['G']),
-                        'games_started': str(row['GS']),
-                        'minutes_played': str(row['MP']),
-                        'field_goals': str(row['FG']),
-                        'field_goal_attempts': str(row['FGA']),
-                        'field_goal_percentage': str(row['FG%']).rstrip('%') if pd.notna(row['FG%']) else '0',
-                        'three_pointers': str(row['3P']),
-                        'three_point_attempts': str(row['3PA']),
-                        'three_point_percentage': str(row['3P%']).rstrip('%') if pd.notna(row['3P%']) else '0',
-                        'two_pointers': str(row['2P']),
-                        'two_point_attempts': str(row['2PA']),
-                        'two_point_percentage': str(row['2P%']).rstrip('%') if pd.notna(row['2P%']) else '0',
-                        'points_per_game': str(row['PTS']),
-                        'rebounds_per_game': str(row['TRB']),
-                        'assists_per_game': str(row['AST']),
-                        'last_updated': datetime.now()
-                    }
-                    
-                    stats.append(stats_dict)
-            
-            logger.info(f"Successfully scraped Lakers player stats. Found stats for {len(stats)} players")
+            stats = stats_frame(extract_columns(stats_table), team_id, season)
+            self.metrics.add('rows_parsed', len(stats), table='per_game_stats')
+            logger.info(f"Successfully scraped {team_id} {season} player stats. Found stats for {len(stats)} players")
             return stats
         except Exception as e:
-            logger.error(f"Error scraping Lakers player stats: {str(e)}")
-            return []
+            logger.error(f"Error scraping {team_id} {season} player stats: {str(e)}")
+            return stats_frame({}, team_id, season)
+
+    def game_log_url(self, player_id: str, season: int) -> str:
+        """Return a player's regular season game log page URL."""
+        return f"{self.base_url}/players/{player_id[0]}/{player_id}/gamelog/{season}"
+
+    def get_game_log_frame(self, player_id: str, season: int,
+                           failed: Optional[set] = None) -> "pd.DataFrame":
+        """Get a player's games in a season as a frame typed like the player_game_logs table.
+        
+        A page that cannot be fetched or parsed gives an empty frame, and
+        (player_id, season) is added to failed if one is passed.
+        """
+        from schema import game_log_frame
+        url = self.game_log_url(player_id, season)
+        try:
+            doc = self.pages.get(url)
+            table = find_table(doc, 'player_game_log_reg')
+            if table is None:
+                table = find_table(doc, 'pgl_basic')
+            if table is None:
+                logger.error(f"Could not find game log table for {player_id} {season}")
+                return game_log_frame({}, player_id, season)
+            
+            with self.metrics.timer('transform'):
+                games = game_log_frame(extract_stat_columns(table), player_id, season)
+            self.metrics.add('rows_parsed', len(games), table='player_game_logs')
+            return games
+        except CircuitOpenError:
+            # The site is down or blocking us, so stop the stream instead of skipping every page
+            self.metrics.add('game_logs_failed')
+            raise
+        except Exception as e:
+            logger.error(f"Error scraping {player_id} {season} game log: {str(e)}")
+            self.metrics.add('game_logs_failed')
+            if failed is not None:
+                failed.add((player_id, season))
+            return game_log_frame({}, player_id, season)
+        finally:
+            # Each page is read once, so keep nothing around
+            self.pages.evict(url)
+
+    def iter_game_logs(self, players: Iterable[Tuple[str, int]], max_workers: int = 4,
+                       failed: Optional[set] = None) -> Iterator["pd.DataFrame"]:
+        """Stream game log frames for (player_id, season) pairs, in order.
+        
+        At most 2 * max_workers pages are downloading or waiting to be
+        consumed at any time, so memory stays flat however many player
+        seasons are requested. Pairs whose page failed are added to failed.
+        """
+        players = iter(players)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque(
+                executor.submit(self.get_game_log_frame, player_id, season, failed)
+                for player_id, season in itertools.islice(players, 2 * max_workers)
+            )
+            while pending:
+                games = pending.popleft().result()
+                for player_id, season in itertools.islice(players, 1):
+                    pending.append(executor.submit(self.get_game_log_frame, player_id, season, failed))
+                if len(games):
+                    yield games
+
+    def get_roster(self, team_id: str = None, season: int = None) -> List[Dict]:
+        """Get roster information for a team season."""
+        from schema import frame_records
+        return frame_records(self.get_roster_frame(team_id, season))
+
+    def get_player_stats(self, team_id: str = None, season: int = None) -> List[Dict]:
+        """Get per-game stats for a team's players in a season."""
+        from schema import frame_records
+        return frame_records(self.get_player_stats_frame(team_id, season))
+
+    def scrape_target(self, team_id: str, season: int) -> Dict:
+        """Scrape team, roster and stats records for one (team, season) target.
+        
+        Uses the parsed tree already in the page cache if there is one, and
+        fetches and parses the page otherwise.
+        """
+        # Parse the page outside the transform timing
+        self.pages.ensure_parsed(self.team_url(team_id, season))
+        with self.metrics.timer('transform'):
+            records = {
+                'team': self.get_team_info(team_id, season),
+                'roster': self.get_roster_frame(team_id, season),
+                'stats': self.get_player_stats_frame(team_id, season)
+            }
+        # All three extractors have run, so the parsed tree is no longer needed
+        self.pages.evict(self.team_url(team_id, season))
+        if records['roster'].empty and records['stats'].empty:
+            # A block page or layout change, which must not load as an empty team season
+            raise ValueError(f"No roster or stats found on the {team_id} {season} page")
+        return records
+
+    def changed_targets(self, targets: List[Tuple[str, int]],
+                        max_workers: int = 4) -> List[Tuple[str, int]]:
+        """Return the (team, season) targets whose page changed since the last fetch."""
+        def check(target):
+            try:
+                return self.pages.has_changed(self.team_url(*target))
+            except Exception as e:
+                # Let the full scrape surface the error
+                logger.warning(f"Error checking {target[0]} {target[1]} for changes: {str(e)}")
+                return True
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            flags = list(executor.map(check, targets))
+        return [target for target, changed in zip(targets, flags) if changed]
+
+# Scraper of a parse worker process, created for its first page
+_worker_scraper = None
+
+def parse_target_page(team_id: str, season: int, body: bytes,
+                      base_url: str) -> Tuple[Dict, Dict, Dict]:
+    """Parse a fetched team season page into scrape_target records, in a process pool worker.
+    
+    lxml holds the GIL while it parses, so processes are what let parsing
+    use more than one core.
+    
+    Returns:
+        The records, with the worker's metrics state and page cache counters
+        for this page, for the parent to merge into its own
+    """
+    global _worker_scraper
+    if _worker_scraper is None or _worker_scraper.base_url != base_url:
+        _worker_scraper = LakersDataScraper(base_url=base_url)
+    _worker_scraper.reset()
+    _worker_scraper.metrics.reset()
+    _worker_scraper.pages.parse(_worker_scraper.team_url(team_id, season), body)
+    records = _worker_scraper.scrape_target(team_id, season)
+    return records, _worker_scraper.metrics.state(), dict(_worker_scraper.pages.stats)
 
 logging.basicConfig(
     level=logging.INFO,
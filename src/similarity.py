@@ -0,0 +1,143 @@
+import glob
+import logging
+import os
+from typing import Dict, Optional
+from atomic import atomic_path
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'indexes')
+
+# The points per game model's inputs, which describe how a player plays
+FEATURE_COLUMNS = [
+    'games_played', 'minutes_played', 'field_goal_percentage',
+    'three_point_percentage', 'rebounds_per_game', 'assists_per_game'
+]
+
+# Columns identifying each player season in the index
+KEY_COLUMNS = ['player_id', 'name', 'team_id', 'season']
+
+# KD-trees suit the handful of feature dimensions, ball trees are kept as an option
+ALGORITHMS = ('kd_tree', 'ball_tree')
+
+def index_root(directory: str = None) -> str:
+    return directory or os.getenv('SIMILARITY_INDEX_DIR', DEFAULT_INDEX_DIR)
+
+def index_path(version: str, directory: str = None) -> str:
+    return os.path.join(index_root(directory), f"similarity-{version}.joblib")
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour index over the standardized FEATURE_COLUMNS of every
+    player season. Queries walk a KD-tree (or ball tree), so finding the
+    top k stays fast with tens of thousands of player seasons.
+    """
+
+    def __init__(self, tree, rows: pd.DataFrame, vectors: np.ndarray, mean: np.ndarray,
+                 scale: np.ndarray, version: str = None):
+        self.tree = tree
+        self.rows = rows.reset_index(drop=True)
+        self.vectors = vectors
+        self.mean = mean
+        self.scale = scale
+        self.version = version
+        # Players traded mid-season have a row per team, looked up by the first without a team
+        self._positions = {}
+        for position, key in enumerate(zip(self.rows['player_id'], self.rows['season'], self.rows['team_id'])):
+            self._positions[key] = position
+            self._positions.setdefault(key[:2], position)
+
+    @classmethod
+    def build(cls, stats: pd.DataFrame, version: str = None,
+              algorithm: str = 'kd_tree') -> Optional['SimilarityIndex']:
+        """
+        Build an index from player_stats rows with KEY_COLUMNS and FEATURE_COLUMNS.
+        Returns:
+            The index, or None if there are no rows
+        """
+        from sklearn.neighbors import BallTree, KDTree
+
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm {algorithm}, expected one of {', '.join(ALGORITHMS)}")
+        if stats.empty:
+            return None
+        features = stats[FEATURE_COLUMNS].apply(pd.to_numeric, errors='coerce').astype('float64')
+        # Fill gaps the way prepare_ml_features does, then put every feature on one scale
+        features = features.fillna(features.mean()).fillna(0)
+        mean = features.mean().to_numpy()
+        scale = features.std(ddof=0).replace(0, 1).to_numpy()
+        vectors = (features.to_numpy() - mean) / scale
+        tree = (KDTree if algorithm == 'kd_tree' else BallTree)(vectors)
+        rows = pd.concat([stats[KEY_COLUMNS], features], axis=1)
+        return cls(tree, rows, vectors, mean, scale, version)
+
+    def save(self, path: str) -> None:
+        import joblib
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_path(path) as tmp_path:
+            joblib.dump(self, tmp_path)
+
+    @staticmethod
+    def load(path: str) -> 'SimilarityIndex':
+        import joblib
+        return joblib.load(path)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _results(self, distances: np.ndarray, positions: np.ndarray) -> pd.DataFrame:
+        results = self.rows.iloc[positions].reset_index(drop=True)
+        results['distance'] = distances
+        return results
+
+    def similar(self, player_id: str, season: int, team_id: str = None, k: int = 10) -> pd.DataFrame:
+        """
+        Return the k player seasons closest to a player's season, nearest first.
+        The player's other seasons are included, so careers can be compared too.
+        """
+        key = (player_id, season, team_id) if team_id else (player_id, season)
+        position = self._positions.get(key)
+        if position is None:
+            return self._results(np.empty(0), np.empty(0, dtype=int))
+        k = min(k + 1, len(self))
+        distances, positions = self.tree.query(self.vectors[position:position + 1], k=k)
+        distances, positions = distances[0], positions[0]
+        keep = positions != position
+        return self._results(distances[keep], positions[keep])[:k - 1]
+
+    def nearest(self, features: Dict[str, float], k: int = 10) -> pd.DataFrame:
+        """Return the k player seasons closest to a stat line given as {feature: value}"""
+        vector = (np.array([[float(features[column]) for column in FEATURE_COLUMNS]]) - self.mean) / self.scale
+        distances, positions = self.tree.query(vector, k=min(k, len(self)))
+        return self._results(distances[0], positions[0])
+
+def write_index(stats: pd.DataFrame, version: str, directory: str = None,
+                keep: int = 3) -> Optional[str]:
+    """
+    Build and persist the index for a data version, keeping the newest keep indexes.
+    Returns:
+        Path of the index file, or None if there were no rows
+    """
+    index = SimilarityIndex.build(stats, version, os.getenv('SIMILARITY_ALGORITHM', 'kd_tree'))
+    if index is None:
+        return None
+    path = index_path(version, directory)
+    index.save(path)
+    _prune(index_root(directory), path, keep)
+    return path
+
+def _prune(root: str, current: str, keep: int) -> None:
+    paths = sorted(glob.glob(os.path.join(root, 'similarity-*.joblib')), key=os.path.getmtime, reverse=True)
+    for path in paths[keep:]:
+        if path != current:
+            os.remove(path)
+
+def load_index(version: str, directory: str = None) -> Optional[SimilarityIndex]:
+    """Load the persisted index of a data version, or None if the ETL has not built one"""
+    path = index_path(version, directory)
+    if not os.path.exists(path):
+        return None
+    return SimilarityIndex.load(path)
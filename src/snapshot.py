@@ -0,0 +1,108 @@
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+from atomic import write_atomic
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'snapshots')
+
+# File in the snapshot directory naming the latest published snapshot
+CURRENT_FILE = 'CURRENT'
+
+# Hive partition columns of each exported table
+PARTITIONS = {
+    'teams': ['team_id'],
+    'players': ['team_id'],
+    'player_stats': ['season', 'team_id']
+}
+
+def snapshot_root(directory: str = None) -> str:
+    return directory or os.getenv('SNAPSHOT_DIR', DEFAULT_SNAPSHOT_DIR)
+
+def write_snapshot(frames: Dict[str, pd.DataFrame], version: str, directory: str = None,
+                   keep: int = 3) -> str:
+    """
+    Publish frames as an immutable set of Parquet datasets under <directory>/<version>.
+    Files are written to a staging directory and renamed into place, then
+    CURRENT is pointed at the new version, so readers never see a partial
+    snapshot. Only the newest keep snapshots are kept.
+    Returns:
+        Path of the published snapshot
+    """
+    root = snapshot_root(directory)
+    path = os.path.join(root, version)
+    os.makedirs(root, exist_ok=True)
+    if not os.path.exists(path):
+        staging = tempfile.mkdtemp(prefix=f".{version}-", dir=root)
+        try:
+            for name, df in frames.items():
+                if df.empty:
+                    continue
+                partitioning = PARTITIONS.get(name)
+                # pyarrow refuses more than 1024 partitions by default, fewer than
+                # season x team_id covers once decades of seasons are loaded
+                partitions = len(df[partitioning].drop_duplicates()) if partitioning else 1
+                ds.write_dataset(
+                    pa.Table.from_pandas(df, preserve_index=False),
+                    os.path.join(staging, name),
+                    format='parquet',
+                    partitioning=partitioning,
+                    partitioning_flavor='hive',
+                    basename_template='part-{i}.parquet',
+                    max_partitions=max(1024, partitions)
+                )
+            os.rename(staging, path)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    write_atomic(os.path.join(root, CURRENT_FILE), version)
+    _prune(root, version, keep)
+    return path
+
+def _prune(root: str, current: str, keep: int) -> None:
+    snapshots = sorted(
+        (entry for entry in os.scandir(root) if entry.is_dir() and not entry.name.startswith('.')),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True
+    )
+    for entry in snapshots[keep:]:
+        if entry.name != current:
+            # Readers that still have old files mapped keep their view until they close them
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+def current_version(directory: str = None) -> Optional[str]:
+    """Return the version of the latest published snapshot, or None if there is none"""
+    try:
+        with open(os.path.join(snapshot_root(directory), CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def has_snapshot(version: str, directory: str = None) -> bool:
+    return os.path.isdir(os.path.join(snapshot_root(directory), version))
+
+def read_table(name: str, version: str, columns: List[str] = None, filter=None,
+               directory: str = None) -> pd.DataFrame:
+    """
+    Read one table of a snapshot through memory-mapped files.
+    Only the requested columns are decoded, and filter (a pyarrow.dataset
+    expression on e.g. season or team_id) skips whole partitions.
+    """
+    path = os.path.join(snapshot_root(directory), version, name)
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=columns or [])
+    dataset = ds.dataset(
+        path,
+        format='parquet',
+        partitioning='hive',
+        filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True)
+    )
+    return dataset.to_table(columns=columns, filter=filter).to_pandas()
@@ -0,0 +1,84 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+import logging
+import os
+import sqlite3
+from urllib.request import pathname2url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nba_data.db')
+
+# Seconds a connection waits on another connection's lock before giving up
+BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', '30'))
+
+# Applied to every SQLite connection, readers and writer alike. WAL lets
+# readers keep reading the last committed data while the ETL writes, and
+# NORMAL sync is durable across application crashes in WAL mode.
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'cache_size': -int(os.getenv('SQLITE_CACHE_KIB', '65536')),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_BYTES', str(256 * 1024 * 1024))),
+    'temp_store': 'MEMORY'
+}
+
+# Connection pool for server databases, sized for the ETL's load workers plus the dashboard
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+
+def _apply_pragmas(conn, busy_timeout: float = BUSY_TIMEOUT) -> None:
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+def create_db_engine(database_url: str) -> Engine:
+    """
+    Create the engine the ETL writes through.
+    SQLite databases are switched to WAL mode with the shared pragmas;
+    PostgreSQL gets a sized, pre-pinged connection pool.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite':
+        engine = create_engine(
+            url,
+            connect_args={'timeout': BUSY_TIMEOUT, 'check_same_thread': False}
+        )
+
+        @event.listens_for(engine, 'connect')
+        def configure(dbapi_connection, _):
+            # WAL is stored in the file, but setting it again is a cheap no-op
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.close()
+            _apply_pragmas(dbapi_connection)
+
+        return engine
+
+    if url.get_backend_name() == 'postgresql':
+        return create_engine(
+            url,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+            pool_recycle=POOL_RECYCLE,
+            pool_pre_ping=True
+        )
+    return create_engine(url)
+
+def connect_readonly(db_path: str = None, busy_timeout: float = BUSY_TIMEOUT) -> sqlite3.Connection:
+    """
+    Open a read-only connection to the SQLite database for dashboards and reports.
+    Reads see the last committed data and never take the write lock, so they
+    run alongside an ETL load. Raises sqlite3.OperationalError if the file
+    does not exist instead of creating an empty database.
+    """
+    db_path = os.path.abspath(db_path or os.getenv('NBA_DB_PATH', DEFAULT_DB_PATH))
+    conn = sqlite3.connect(f"file:{pathname2url(db_path)}?mode=ro", uri=True, timeout=busy_timeout,
+                           check_same_thread=False)
+    _apply_pragmas(conn, busy_timeout)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
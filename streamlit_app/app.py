@@ -1,10 +1,12 @@
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-from data_loader import load_data, prepare_ml_features
-from ml_model import LakersPredictor
+from data_loader import (current_data_version, load_data, load_similarity_index, memory_report,
+                         prepare_ml_features)
+from figure_cache import FigureCache
 import pandas as pd
 
+# plotly and scikit-learn are imported by the views that use them, so a
+# cold start only pays for what the first page needs
+
 # Page config
 st.set_page_config(
     page_title="Lakers Analytics Dashboard",
@@ -27,54 +29,94 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_model_registry() -> "ModelRegistry":
+    from ml_model import ModelRegistry
+    return ModelRegistry()
+
+@st.cache_resource
+def get_figure_cache() -> FigureCache:
+    return FigureCache()
+
 # Load data
-team_df, players_df, stats_df = load_data()
+data_version = current_data_version()
+team_df, players_df, stats_df = load_data(data_version)
+figures = get_figure_cache()
 
 # Sidebar
 st.sidebar.title("Lakers Dashboard")
 selected_view = st.sidebar.radio(
     "Select View",
-    ["Team Overview", "Player Stats", "Points Predictor"]
+    ["Team Overview", "Player Stats", "Similar Players", "Points Predictor"]
 )
+with st.sidebar.expander("Memory use"):
+    st.dataframe(
+        memory_report({'teams': team_df, 'players': players_df, 'stats': stats_df}),
+        hide_index=True
+    )
+    cache = figures.report()
+    st.caption(f"Figure cache: {cache['entries']} figures in {cache['bytes'] / 1e6:.2f} MB, "
+               f"{cache['hits']} hits, {cache['misses']} misses, {cache['evictions']} evictions")
+    if st.button("Clear figure cache"):
+        figures.clear()
+        st.rerun()
 
 if selected_view == "Team Overview":
+    import plotly.express as px
     st.title("Los Angeles Lakers Team Overview")
     
+    # The teams table holds a row per team season
+    lakers_df = team_df[team_df['team_id'] == 'LAL'].sort_values('year', ascending=False)
+    if lakers_df.empty:
+        st.warning("No Lakers team data available. Please run the ETL pipeline to collect data.")
+        st.stop()
+    selected_season = st.selectbox("Season", lakers_df['year'].tolist())
+    team = lakers_df[lakers_df['year'] == selected_season].iloc[0]
+    
     # Team Record
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Wins", team_df['wins'].iloc[0])
+        st.metric("Wins", int(team['wins']))
     with col2:
-        st.metric("Losses", team_df['losses'].iloc[0])
+        st.metric("Losses", int(team['losses']))
     with col3:
-        win_pct = team_df['wins'].iloc[0] / (team_df['wins'].iloc[0] + team_df['losses'].iloc[0])
+        win_pct = team['wins'] / (team['wins'] + team['losses'])
         st.metric("Win %", f"{win_pct:.3f}")
     
     # Roster Overview
     st.subheader("Team Roster")
+    season_players = stats_df.loc[(stats_df['team_id'] == 'LAL') & (stats_df['season'] == selected_season),
+                                  'player_id']
+    roster_df = players_df[players_df['player_id'].isin(season_players)]
     
     # Position distribution
-    pos_dist = players_df['position'].value_counts()
-    fig_pos = px.pie(
-        values=pos_dist.values,
-        names=pos_dist.index,
-        title="Position Distribution"
-    )
-    st.plotly_chart(fig_pos)
+    def position_figure():
+        pos_dist = roster_df['position'].value_counts()
+        return px.pie(
+            values=pos_dist.values,
+            names=pos_dist.index,
+            title="Position Distribution"
+        )
+    st.plotly_chart(figures.get_or_build(selected_view, 'positions', (selected_season,), data_version,
+                                         position_figure))
     
     # Create height vs weight scatter plot
-    fig_hw = px.scatter(
-        players_df,
-        x='height_inches',
-        y='weight',
-        text='name',
-        title='Lakers Roster: Height vs Weight Distribution',
-        labels={'height_inches': 'Height (inches)', 'weight': 'Weight (lbs)'}
-    )
-    fig_hw.update_traces(textposition='top center')
-    st.plotly_chart(fig_hw)
+    def height_weight_figure():
+        fig_hw = px.scatter(
+            roster_df,
+            x='height_inches',
+            y='weight',
+            text='name',
+            title='Lakers Roster: Height vs Weight Distribution',
+            labels={'height_inches': 'Height (inches)', 'weight': 'Weight (lbs)'}
+        )
+        fig_hw.update_traces(textposition='top center')
+        return fig_hw
+    st.plotly_chart(figures.get_or_build(selected_view, 'height_weight', (selected_season,), data_version,
+                                         height_weight_figure))
 
 elif selected_view == "Player Stats":
+    import plotly.graph_objects as go
     st.title("Lakers Player Statistics")
     
     if stats_df.empty:
@@ -103,22 +145,61 @@ elif selected_view == "Player Stats":
                 st.metric("FG%", f"{float(player_stats['field_goal_percentage']):.1f}%")
             
             # Shooting splits
-            fig_shooting = go.Figure()
-            fig_shooting.add_trace(go.Bar(
-                x=['Field Goal %', '3PT %', '2PT %'],
-                y=[
-                    player_stats['field_goal_percentage'],
-                    player_stats['three_point_percentage'],
-                    player_stats['two_point_percentage']
-                ],
-                name='Shooting Splits'
-            ))
-            fig_shooting.update_layout(title="Shooting Percentages")
-            st.plotly_chart(fig_shooting)
+            def shooting_figure():
+                fig_shooting = go.Figure()
+                fig_shooting.add_trace(go.Bar(
+                    x=['Field Goal %', '3PT %', '2PT %'],
+                    y=[
+                        player_stats['field_goal_percentage'],
+                        player_stats['three_point_percentage'],
+                        player_stats['two_point_percentage']
+                    ],
+                    name='Shooting Splits'
+                ))
+                fig_shooting.update_layout(title="Shooting Percentages")
+                return fig_shooting
+            st.plotly_chart(figures.get_or_build(selected_view, 'shooting', (selected_player,), data_version,
+                                                 shooting_figure))
         else:
             st.warning(f"No statistics available for {selected_player}")
 
+elif selected_view == "Similar Players":
+    st.title("Similar Players")
+    
+    if stats_df.empty:
+        st.warning("No player statistics available. Please run the ETL pipeline to collect data.")
+    else:
+        # The ETL's nearest-neighbour index, so a query never scans the frames
+        index = load_similarity_index(data_version)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            selected_player = st.selectbox("Select Player", stats_df['name'].unique())
+        player_seasons = stats_df[stats_df['name'] == selected_player].sort_values('season', ascending=False)
+        with col2:
+            selected_season = st.selectbox(
+                "Season",
+                list(zip(player_seasons['season'], player_seasons['team_id'])),
+                format_func=lambda season_team: f"{season_team[0]} ({season_team[1]})"
+            )
+        with col3:
+            top_k = st.slider("Players to show", min_value=5, max_value=25, value=10)
+        
+        season, team_id = selected_season
+        player_id = player_seasons.loc[player_seasons['season'] == season, 'player_id'].iloc[0]
+        similar = index.similar(player_id, season, team_id, k=top_k)
+        if similar.empty:
+            st.warning(f"{selected_player} is not in the similarity index yet")
+        else:
+            st.dataframe(
+                similar.drop(columns=['player_id']).rename(columns={
+                    'name': 'Player', 'team_id': 'Team', 'season': 'Season', 'distance': 'Distance'
+                }),
+                hide_index=True
+            )
+
 else:  # Points Predictor
+    import plotly.express as px
     st.title("Lakers Points Predictor")
     
     # Prepare data for ML
@@ -127,9 +208,8 @@ else:  # Points Predictor
     if X.empty or len(X) < 2:
         st.warning("Insufficient data for prediction model. Please run the ETL pipeline to collect more data.")
     else:
-        # Train model
-        predictor = LakersPredictor()
-        metrics = predictor.train(X, y)
+        # Load the trained model, training it only when the data or config changed
+        predictor, metrics = get_model_registry().get_or_train(X, y)
         
         # Model metrics
         st.subheader("Model Performance")
@@ -140,15 +220,18 @@ else:  # Points Predictor
             st.metric("RMSE", f"{metrics['rmse']:.3f}")
         
         # Feature importance plot
-        feat_imp = predictor.get_feature_importance()
-        fig_imp = px.bar(
-            feat_imp,
-            x='importance',
-            y='feature',
-            orientation='h',
-            title="Feature Importance"
-        )
-        st.plotly_chart(fig_imp)
+        def importance_figure():
+            feat_imp = predictor.get_feature_importance()
+            return px.bar(
+                feat_imp,
+                x='importance',
+                y='feature',
+                orientation='h',
+                title="Feature Importance"
+            )
+        # Keyed by the model too, as a new best model can be served for the same data
+        st.plotly_chart(figures.get_or_build(selected_view, 'feature_importance', (predictor.fingerprint,),
+                                             data_version, importance_figure))
         
         # Interactive prediction
         st.subheader("Predict Points per Game")
@@ -166,11 +249,22 @@ else:  # Points Predictor
         
         # Make prediction
         if st.button("Predict Points"):
-            input_data = pd.DataFrame([[games, minutes, fg_pct, three_pct, rebounds, assists]], 
+            # The stats store shooting percentages as fractions
+            input_data = pd.DataFrame([[games, minutes, fg_pct / 100, three_pct / 100, rebounds, assists]],
                                     columns=X.columns)
             prediction = predictor.predict(input_data)[0]
             st.success(f"Predicted Points per Game: {prediction:.1f}")
 
+            # Real player seasons with the closest stat lines, from the similarity index
+            st.subheader("Closest Player Seasons")
+            nearest = load_similarity_index(data_version).nearest(input_data.iloc[0].to_dict(), k=5)
+            st.dataframe(
+                nearest.drop(columns=['player_id']).rename(columns={
+                    'name': 'Player', 'team_id': 'Team', 'season': 'Season', 'distance': 'Distance'
+                }),
+                hide_index=True
+            )
+
 # Footer
 st.markdown("---")
 st.markdown("Lakers Analytics Dashboard | Data updated daily")
@@ -1,59 +1,214 @@
+import logging
 import sqlite3
+import sys
 import pandas as pd
-from typing import Tuple, Dict
+import streamlit as st
+from typing import List, Optional, Tuple, Dict
 import os
 
-def load_data() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+# Share the ETL's storage settings from src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from storage import connect_readonly
+from snapshot import has_snapshot, read_table
+from similarity import FEATURE_COLUMNS, SimilarityIndex, load_index
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'nba_data.db')
+
+# Seconds between checks for a new data version
+VERSION_CHECK_TTL = 30
+
+# 'auto' reads the ETL's Parquet snapshot of the current data version when
+# there is one and SQLite otherwise, 'sqlite' always queries the database
+DATA_SOURCE = os.getenv('DASHBOARD_DATA_SOURCE', 'auto')
+
+# Columns the dashboard views and the points model use, nothing else is loaded
+TEAM_COLUMNS = ['team_id', 'name', 'year', 'wins', 'losses']
+PLAYER_COLUMNS = ['player_id', 'name', 'position', 'height_inches', 'weight']
+STATS_COLUMNS = ['player_id', 'name', 'team_id', 'season', 'position', 'points_per_game',
+                 'two_point_percentage'] + FEATURE_COLUMNS
+
+# Text repeated across rows, stored once per distinct value
+CATEGORY_COLUMNS = ['player_id', 'name', 'team_id', 'position']
+
+PLAYERS_QUERY = """
+    SELECT 
+        p.player_id,
+        p.name,
+        p.position,
+        pp.height_inches,
+        pp.weight_lbs as weight
+    FROM players p
+    LEFT JOIN player_profiles pp ON pp.player_id = p.player_id
+"""
+
+STATS_QUERY = """
+    SELECT 
+        ps.player_id,
+        p.name,
+        ps.team_id,
+        ps.season,
+        p.position,
+        ps.points_per_game,
+        ps.two_point_percentage,
+        ps.games_played,
+        ps.minutes_played,
+        ps.field_goal_percentage,
+        ps.three_point_percentage,
+        ps.rebounds_per_game,
+        ps.assists_per_game
+    FROM player_stats ps
+    JOIN players p ON ps.player_id = p.player_id
+"""
+
+LEGACY_PLAYERS_QUERY = """
+    SELECT 
+        player_id,
+        name,
+        position,
+        CAST(SUBSTR(height, 1, INSTR(height, '-')-1) AS INTEGER) * 12 + 
+        CAST(SUBSTR(height, INSTR(height, '-')+1) AS INTEGER) as height_inches,
+        CAST(weight AS INTEGER) as weight
+    FROM players
+"""
+
+def get_data_version() -> str:
+    """
+    Return a token that changes whenever the ETL loads new data.
+    Uses the data_version row bumped by the ETL, or the database file's
+    size and modification time for databases without one.
+    """
+    conn = connect_readonly(DB_PATH)
+    try:
+        row = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+        if row:
+            return f"v{row[0]}"
+    except sqlite3.OperationalError:
+        pass
+    finally:
+        conn.close()
+
+    stat = os.stat(DB_PATH)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+@st.cache_data(ttl=VERSION_CHECK_TTL, show_spinner=False)
+def _current_data_version() -> str:
+    return get_data_version()
+
+@st.cache_resource(max_entries=1, show_spinner="Loading data...")
+def _load_data_version(version: str) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    # cache_resource hands the same frames to every session, so callers must not modify them
+    frames = read_data(version)
+    report = memory_report(dict(zip(['teams', 'players', 'stats'], frames)))
+    logger.info(f"Loaded data {version}: " + ', '.join(
+        f"{row.frame} {row.rows} rows {row.memory_mb:.2f}MB" for row in report.itertuples()
+    ))
+    return frames
+
+def current_data_version() -> str:
+    """Return the data version, checked against the database at most every VERSION_CHECK_TTL seconds"""
+    return _current_data_version()
+
+def load_data(version: str = None) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
-    Load data from SQLite database
+    Load data for a data version, the current one by default, shared across reruns and sessions
     Returns:
         Tuple of DataFrames (team_df, players_df, stats_df)
     """
-    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'nba_data.db')
-    conn = sqlite3.connect(db_path)
+    return _load_data_version(version or _current_data_version())
     
-    # Load team data
-    team_df = pd.read_sql_query("SELECT * FROM teams", conn)
+@st.cache_resource(max_entries=1, show_spinner="Loading similarity index...")
+def load_similarity_index(version: str) -> Optional[SimilarityIndex]:
+    """
+    Load the ETL's player similarity index for a data version, building one
+    from the loaded stats once if the ETL has not
+    """
+    index = load_index(version)
+    if index is None:
+        _, _, stats_df = load_data(version)
+        index = SimilarityIndex.build(stats_df, version)
+    return index
     
-    # Load players data
-    players_df = pd.read_sql_query("""
-        SELECT 
-            player_id,
-            name,
-            number,
-            position,
-            CAST(SUBSTR(height, 1, INSTR(height, '-')-1) AS INTEGER) * 12 + 
-            CAST(SUBSTR(height, INSTR(height, '-')+1) AS INTEGER) as height_inches,
-            CAST(weight AS INTEGER) as weight,
-            college
-        FROM players
-    """, conn)
+def read_snapshot(version: str) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Load data from the ETL's memory-mapped Parquet snapshot of a data version
+    Returns:
+        Tuple of DataFrames (team_df, players_df, stats_df), shaped like the SQLite queries
+    """
+    team_df = read_table('teams', version, TEAM_COLUMNS)
+    players_df = read_table('players', version, ['player_id', 'name', 'position', 'height_inches', 'weight_lbs'])
+    players_df = players_df.rename(columns={'weight_lbs': 'weight'})
+    stats_columns = [column for column in STATS_COLUMNS if column not in ('name', 'position')]
+    stats_df = read_table('player_stats', version, stats_columns).merge(
+        players_df[['player_id', 'name', 'position']], on='player_id'
+    )
+    return team_df, players_df, stats_df
     
-    # Load player stats data with player names
-    stats_df = pd.read_sql_query("""
-        SELECT 
-            ps.*,
-            p.name,
-            p.position,
-            p.height,
-            p.weight
-        FROM player_stats ps
-        JOIN players p ON ps.player_id = p.player_id
-    """, conn)
+def read_data(version: str = None) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Load data from the snapshot of the current data version, or the SQLite database
+    Returns:
+        Tuple of DataFrames (team_df, players_df, stats_df)
+    """
+    if DATA_SOURCE != 'sqlite':
+        version = version or get_data_version()
+        if has_snapshot(version):
+            return _finish_frames(*read_snapshot(version))
     
-    # Convert numeric columns to float
-    numeric_columns = ['points_per_game', 'rebounds_per_game', 'assists_per_game',
-                      'field_goal_percentage', 'three_point_percentage', 'two_point_percentage']
-    for col in numeric_columns:
-        stats_df[col] = pd.to_numeric(stats_df[col], errors='coerce')
+    conn = connect_readonly(DB_PATH)
+    try:
+        # Load team data
+        team_df = pd.read_sql_query(f"SELECT {', '.join(TEAM_COLUMNS)} FROM teams", conn)
+        stats_df = pd.read_sql_query(STATS_QUERY, conn)
     
-    conn.close()
+        try:
+            # Heights come precomputed by the ETL
+            players_df = pd.read_sql_query(PLAYERS_QUERY, conn)
+        except pd.errors.DatabaseError:
+            # Databases the ETL has not refreshed since derived tables were added
+            players_df = pd.read_sql_query(LEGACY_PLAYERS_QUERY, conn)
+    finally:
+        conn.close()
+    return _finish_frames(team_df, players_df, stats_df)
     
-    # Convert height to numeric format
-    if 'height' in players_df.columns:
-        players_df['height'] = players_df['height'].astype(str)
+def _finish_frames(team_df: pd.DataFrame, players_df: pd.DataFrame,
+                   stats_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    return (
+        compact_frame(team_df, TEAM_COLUMNS),
+        compact_frame(players_df, PLAYER_COLUMNS),
+        compact_frame(stats_df, STATS_COLUMNS)
+    )
     
-    return team_df, players_df, stats_df
+def compact_frame(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """
+    Keep only columns, with repeated text as categoricals and numbers in the
+    smallest dtype that holds them: integers without gaps shrink to the
+    narrowest int, everything else to float32
+    """
+    df = df[[column for column in columns if column in df.columns]].copy()
+    for column in df.columns:
+        if column in CATEGORY_COLUMNS:
+            df[column] = df[column].astype('category')
+            continue
+        values = pd.to_numeric(df[column], errors='coerce')
+        if pd.api.types.is_integer_dtype(values):
+            df[column] = pd.to_numeric(values, downcast='integer')
+        else:
+            df[column] = values.astype('float32')
+    return df
+
+def memory_report(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Return the rows, columns and memory use, counting string contents, of each frame"""
+    return pd.DataFrame([
+        {
+            'frame': name,
+            'rows': len(df),
+            'columns': len(df.columns),
+            'memory_mb': df.memory_usage(deep=True).sum() / 1e6
+        }
+        for name, df in frames.items()
+    ])
 
 def prepare_ml_features(stats_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
@@ -61,20 +216,10 @@ def prepare_ml_features(stats_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFr
     """
     if stats_df.empty:
         # Return empty DataFrames with correct columns if no data
-        feature_cols = [
-            'games_played', 'minutes_played', 'field_goal_percentage',
-            'three_point_percentage', 'rebounds_per_game', 'assists_per_game'
-        ]
-        return pd.DataFrame(columns=feature_cols), pd.Series(dtype=float)
-    
-    # Select relevant features
-    feature_cols = [
-        'games_played', 'minutes_played', 'field_goal_percentage',
-        'three_point_percentage', 'rebounds_per_game', 'assists_per_game'
-    ]
+        return pd.DataFrame(columns=FEATURE_COLUMNS), pd.Series(dtype=float)
     
     # Create feature matrix X and target variable y
-    X = stats_df[feature_cols].copy()
+    X = stats_df[FEATURE_COLUMNS].copy()
     y = stats_df['points_per_game'].copy()
     
     # Convert to numeric and handle missing values
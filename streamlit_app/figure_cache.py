@@ -0,0 +1,69 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# Total size of the serialized figures kept, in megabytes
+FIGURE_CACHE_MB = float(os.getenv('DASHBOARD_FIGURE_CACHE_MB', '32'))
+
+class FigureCache:
+    """
+    Least-recently-used cache of Plotly figures, bounded by memory.
+    Figures are stored as their JSON, which is immutable, so one cache can
+    be shared by every session, and its size is what counts against the bound.
+    Keys include the data version, so new ETL data never hits an old figure
+    and stale entries age out on their own.
+    """
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes if max_bytes is not None else int(FIGURE_CACHE_MB * 1024 * 1024)
+        self._figures = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get_or_build(self, view: str, chart: str, params: Tuple, version: str,
+                     build: Callable[[], go.Figure]) -> go.Figure:
+        """
+        Return a view's chart for its parameters (such as the selected player)
+        and the data version, calling build only if it is not cached
+        """
+        key = (view, chart, tuple(params), version)
+        with self._lock:
+            payload = self._figures.get(key)
+            if payload is not None:
+                self._figures.move_to_end(key)
+                self.stats['hits'] += 1
+        if payload is not None:
+            return pio.from_json(payload)
+
+        figure = build()
+        payload = figure.to_json()
+        with self._lock:
+            self.stats['misses'] += 1
+            self._store(key, payload)
+        return figure
+
+    def _store(self, key: Tuple, payload: str) -> None:
+        if len(payload) > self.max_bytes:
+            return
+        if key in self._figures:
+            self._bytes -= len(self._figures.pop(key))
+        self._figures[key] = payload
+        self._bytes += len(payload)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._figures.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.stats['evictions'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._figures.clear()
+            self._bytes = 0
+
+    def report(self) -> Dict:
+        """Return hit, miss and eviction counts with the cache's current size"""
+        with self._lock:
+            return {**self.stats, 'entries': len(self._figures), 'bytes': self._bytes}
@@ -1,17 +1,117 @@
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import KFold, ParameterGrid, train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import joblib
 import pandas as pd
 import numpy as np
 
+# Share the atomic file writes from src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from atomic import atomic_path, write_atomic
+
+DEFAULT_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'random_state': 42
+}
+
+DEFAULT_PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [5, 10, None],
+    'min_samples_leaf': [1, 2]
+}
+
+def _fit_fold(X_train: np.ndarray, y_train: np.ndarray, X_test: np.ndarray,
+              params: Dict, n_estimators: List[int]) -> List[Dict]:
+    """
+    Fit one fold for every n_estimators value of a parameter set.
+    The forest is warm started, so each larger candidate only grows the
+    extra trees instead of refitting the ones already built.
+    """
+    model = RandomForestRegressor(**params, warm_start=True)
+    results = []
+    fit_time = 0.0
+    for count in sorted(n_estimators):
+        model.set_params(n_estimators=count)
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_time += time.perf_counter() - start
+        results.append({
+            'n_estimators': count,
+            'fit_time': fit_time,
+            'predictions': model.predict(X_test)
+        })
+    return results
+
+def cross_validate_search(X: pd.DataFrame, y: pd.Series, param_grid: Dict = None,
+                          n_splits: int = 5, n_jobs: int = None,
+                          random_state: int = 42) -> pd.DataFrame:
+    """
+    Score every parameter combination with k-fold cross-validation, spreading
+    the fold fits over a process pool.
+    Returns:
+        One row per candidate with its out-of-fold R², RMSE and mean fit time,
+        best candidate first
+    """
+    param_grid = dict(param_grid or DEFAULT_PARAM_GRID)
+    n_estimators = param_grid.pop('n_estimators', [DEFAULT_PARAMS['n_estimators']])
+    param_grid.setdefault('random_state', [DEFAULT_PARAMS['random_state']])
+    n_splits = max(2, min(n_splits, len(X)))
+    folds = list(KFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(X))
+    X_values = X.to_numpy(dtype=float)
+    y_values = y.to_numpy(dtype=float)
+
+    candidates = list(ParameterGrid(param_grid))
+    with ProcessPoolExecutor(max_workers=n_jobs or os.cpu_count()) as executor:
+        futures = {
+            (c, f): executor.submit(_fit_fold, X_values[train], y_values[train], X_values[test],
+                                    candidates[c], n_estimators)
+            for c in range(len(candidates))
+            for f, (train, test) in enumerate(folds)
+        }
+        fold_results = {key: future.result() for key, future in futures.items()}
+
+    rows = []
+    for c, params in enumerate(candidates):
+        for i, count in enumerate(sorted(n_estimators)):
+            predictions = np.empty(len(y_values))
+            fold_rmse = []
+            fit_times = []
+            for f, (_, test) in enumerate(folds):
+                result = fold_results[(c, f)][i]
+                predictions[test] = result['predictions']
+                fold_rmse.append(np.sqrt(mean_squared_error(y_values[test], result['predictions'])))
+                fit_times.append(result['fit_time'])
+            rows.append({
+                'params': {**params, 'n_estimators': count},
+                **params,
+                'n_estimators': count,
+                'r2_score': r2_score(y_values, predictions),
+                'rmse': np.sqrt(mean_squared_error(y_values, predictions)),
+                'rmse_std': float(np.std(fold_rmse)),
+                'mean_fit_time': float(np.mean(fit_times))
+            })
+    return pd.DataFrame(rows).sort_values('rmse').reset_index(drop=True)
+
 class LakersPredictor:
-    def __init__(self):
-        self.model = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42
-        )
+    def __init__(self, **params):
+        self.params = {**DEFAULT_PARAMS, **params}
+        self.model = RandomForestRegressor(**self.params)
         self.feature_importance = None
+        # Registry fingerprint of the trained model, set when a ModelRegistry serves it
+        self.fingerprint = None
+        self.metrics = None
+        self.cv_results = None
         
     def train(self, X: pd.DataFrame, y: pd.Series):
         """Train the model and store feature importance"""
@@ -35,9 +135,30 @@ class LakersPredictor:
             'r2_score': r2_score(y_test, y_pred),
             'rmse': np.sqrt(mean_squared_error(y_test, y_pred))
         }
+        self.metrics = metrics
         
         return metrics
     
+    def train_cv(self, X: pd.DataFrame, y: pd.Series, param_grid: Dict = None,
+                 n_splits: int = 5, n_jobs: int = None):
+        """Pick hyperparameters by cross-validated search, then fit them on all rows"""
+        self.cv_results = cross_validate_search(X, y, param_grid, n_splits, n_jobs)
+        best = self.cv_results.iloc[0]
+        self.params = {**self.params, **best['params']}
+        self.model = RandomForestRegressor(**self.params)
+        self.model.fit(X, y)
+        
+        self.feature_importance = pd.DataFrame({
+            'feature': X.columns,
+            'importance': self.model.feature_importances_
+        }).sort_values('importance', ascending=False)
+        
+        self.metrics = {
+            'r2_score': best['r2_score'],
+            'rmse': best['rmse']
+        }
+        return self.metrics
+    
     def predict(self, X: pd.DataFrame) -> np.ndarray:
         """Make predictions using the trained model"""
         return self.model.predict(X)
@@ -45,3 +166,142 @@ class LakersPredictor:
     def get_feature_importance(self) -> pd.DataFrame:
         """Return feature importance DataFrame"""
         return self.feature_importance
+
+def training_fingerprint(X: pd.DataFrame, y: pd.Series, params: Dict) -> str:
+    """Hash the training data and hyperparameters that determine a trained model"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(X.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(X, index=False).values.tobytes())
+    digest.update(pd.util.hash_pandas_object(y, index=False).values.tobytes())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+class ModelRegistry:
+    """
+    Persist trained predictors on disk keyed by a training fingerprint.
+    Models are loaded from disk the first time a fingerprint is requested
+    and kept in memory afterwards; training only happens for new
+    data or hyperparameters. The last cross-validated search is recorded
+    as the current best, which callers asking for no particular
+    hyperparameters are served.
+    """
+    def __init__(self, directory: str = None, max_in_memory: int = 4):
+        if directory is None:
+            directory = os.getenv(
+                'MODEL_REGISTRY_DIR',
+                os.path.join(os.path.dirname(os.path.dirname(__file__)), 'model_registry')
+            )
+        self.directory = directory
+        self.max_in_memory = max_in_memory
+        self._models = {}
+        self._lock = threading.Lock()
+    
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, f"{fingerprint}.joblib")
+    
+    def _best_path(self) -> str:
+        return os.path.join(self.directory, 'best.json')
+    
+    def best(self) -> Optional[Dict]:
+        """Return the current best model's fingerprint, data fingerprint and parameters, if a search ran"""
+        path = self._best_path()
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+    
+    def get_or_train(self, X: pd.DataFrame, y: pd.Series, search: Dict = None,
+                     **params) -> Tuple[LakersPredictor, Dict]:
+        """
+        Return a predictor trained on X and y, training and saving it only if needed.
+        Pass search (train_cv keyword arguments such as param_grid and n_splits)
+        to pick hyperparameters by cross-validation instead of using params as
+        is, and record the result as the current best.
+        With neither search nor params, the current best is served: the
+        searched model itself while the data is unchanged, and its
+        hyperparameters trained on the new data otherwise.
+        """
+        best = self.best() if search is None and not params else None
+        if best is not None and (best['data_fingerprint'] != training_fingerprint(X, y, {})
+                                 or not os.path.exists(self._path(best['fingerprint']))):
+            params = best['params']
+            best = None
+        params = {**DEFAULT_PARAMS, **params}
+        config = {**params, 'search': search} if search is not None else params
+        fingerprint = best['fingerprint'] if best is not None else training_fingerprint(X, y, config)
+        
+        with self._lock:
+            if fingerprint in self._models:
+                predictor = self._models[fingerprint]
+                return predictor, predictor.metrics
+            
+            path = self._path(fingerprint)
+            if os.path.exists(path):
+                entry = joblib.load(path)
+                predictor = entry['predictor']
+            else:
+                predictor = LakersPredictor(**params)
+                if search is not None:
+                    predictor.train_cv(X, y, **search)
+                else:
+                    predictor.train(X, y)
+                self._save(path, {
+                    'predictor': predictor,
+                    'fingerprint': fingerprint,
+                    'params': predictor.params,
+                    'metrics': predictor.metrics,
+                    'feature_importance': predictor.feature_importance,
+                    'cv_results': predictor.cv_results,
+                    'trained_at': datetime.now()
+                })
+            if search is not None:
+                self._save_json(self._best_path(), {
+                    'fingerprint': fingerprint,
+                    'data_fingerprint': training_fingerprint(X, y, {}),
+                    'params': predictor.params
+                })
+            
+            predictor.fingerprint = fingerprint
+            self._models[fingerprint] = predictor
+            # Older fingerprints stay on disk but leave memory
+            while len(self._models) > self.max_in_memory:
+                self._models.pop(next(iter(self._models)))
+            return predictor, predictor.metrics
+    
+    def _save(self, path: str, entry: Dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with atomic_path(path) as tmp_path:
+            joblib.dump(entry, tmp_path)
+    
+    def _save_json(self, path: str, content: Dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(path, json.dumps(content, indent=2))
+
+def main():
+    """Run a cross-validated hyperparameter search on the current data and make the best model current"""
+    from data_loader import prepare_ml_features, read_data
+
+    parser = argparse.ArgumentParser(description="Cross-validated training for the points per game model")
+    parser.add_argument('--folds', type=int, default=5, help="number of cross-validation folds")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default all cores)")
+    parser.add_argument('--grid', default=None,
+                        help="JSON parameter grid, e.g. '{\"n_estimators\": [100, 300], \"max_depth\": [5, null]}'")
+    args = parser.parse_args()
+
+    X, y = prepare_ml_features(read_data()[2])
+    search = {
+        'param_grid': json.loads(args.grid) if args.grid else None,
+        'n_splits': args.folds,
+        'n_jobs': args.jobs
+    }
+    predictor, metrics = ModelRegistry().get_or_train(X, y, search=search)
+    if predictor.cv_results is not None:
+        print(predictor.cv_results.drop(columns='params').to_string(index=False))
+    print(f"Best parameters: {predictor.params}")
+    print(f"Cross-validated R²: {metrics['r2_score']:.3f}, RMSE: {metrics['rmse']:.3f}")
+
+if __name__ == "__main__":
+    # Run from the importable module, so saved predictors unpickle as
+    # ml_model.LakersPredictor in the dashboard and scoring processes
+    import ml_model
+    ml_model.main()
@@ -0,0 +1,220 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Tuple
+import numpy as np
+import pandas as pd
+from data_loader import FEATURE_COLUMNS, prepare_ml_features, read_data
+from ml_model import LakersPredictor, ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_COLUMN = 'predicted_points_per_game'
+
+def load_predictor(registry: ModelRegistry = None) -> LakersPredictor:
+    """
+    Load the predictor for the current data, the same one the dashboard uses
+    """
+    registry = registry or ModelRegistry()
+    X, y = prepare_ml_features(read_data()[2])
+    if X.empty or len(X) < 2:
+        raise ValueError("Insufficient data for prediction model. Please run the ETL pipeline to collect more data.")
+    predictor, _ = registry.get_or_train(X, y)
+    return predictor
+
+def _read_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+def score_file(predictor: LakersPredictor, input_path: str, output_path: str,
+               chunk_size: int = 50000) -> int:
+    """
+    Stream feature rows from a CSV or Parquet file through the predictor
+    in chunks, writing each row with its predicted points per game.
+    Returns:
+        Number of rows scored
+    """
+    # Spread each chunk's trees over every core
+    predictor.model.set_params(n_jobs=-1)
+    writer = None
+    rows = 0
+    try:
+        for i, chunk in enumerate(_read_chunks(input_path, chunk_size)):
+            missing = set(FEATURE_COLUMNS) - set(chunk.columns)
+            if missing:
+                raise ValueError(f"Missing feature columns: {', '.join(sorted(missing))}")
+            
+            chunk[PREDICTION_COLUMN] = predictor.predict(chunk[FEATURE_COLUMNS])
+            rows += len(chunk)
+            
+            if output_path.endswith('.parquet'):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(output_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            logger.info(f"Scored {rows} rows")
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+class MicroBatcher:
+    """
+    Group concurrent prediction requests into one predict call.
+    A batch is sent once it holds max_batch_size rows or its first
+    request has waited max_wait_ms.
+    """
+    def __init__(self, predictor: LakersPredictor, max_batch_size: int = 256, max_wait_ms: float = 5):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+    
+    def predict(self, rows: pd.DataFrame, timeout: float = 30) -> np.ndarray:
+        """Queue rows for the next batch and wait for their predictions"""
+        future = Future()
+        self._queue.put((rows, future))
+        return future.result(timeout=timeout)
+    
+    def _collect(self) -> List[Tuple[pd.DataFrame, Future]]:
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                X = pd.concat([rows for rows, _ in batch], ignore_index=True)
+                predictions = self.predictor.predict(X[FEATURE_COLUMNS])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            start = 0
+            for rows, future in batch:
+                future.set_result(predictions[start:start + len(rows)])
+                start += len(rows)
+
+def make_handler(batcher: MicroBatcher):
+    class PredictionHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: dict):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, {'status': 'ok'})
+            else:
+                self._send(404, {'error': 'not found'})
+        
+        def do_POST(self):
+            """Score a feature row object or a list of them posted to /predict"""
+            if self.path != '/predict':
+                self._send(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length))
+                rows = pd.DataFrame(body if isinstance(body, list) else [body])
+                missing = set(FEATURE_COLUMNS) - set(rows.columns)
+                if missing:
+                    raise ValueError(f"Missing feature columns: {', '.join(sorted(missing))}")
+                rows = rows[FEATURE_COLUMNS].astype(float)
+            except (ValueError, TypeError) as e:
+                self._send(400, {'error': str(e)})
+                return
+            
+            try:
+                predictions = batcher.predict(rows)
+            except Exception as e:
+                logger.error(f"Error scoring request: {str(e)}")
+                self._send(500, {'error': str(e)})
+                return
+            self._send(200, {'predictions': [float(value) for value in predictions]})
+        
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return PredictionHandler
+
+class ScoringServer(ThreadingHTTPServer):
+    # Many clients connect at once, which is the point of micro-batching
+    request_queue_size = 128
+    daemon_threads = True
+
+def serve(predictor: LakersPredictor, host: str = '127.0.0.1', port: int = 8600,
+          max_batch_size: int = 256, max_wait_ms: float = 5) -> None:
+    """Run the local HTTP scoring service until interrupted"""
+    batcher = MicroBatcher(predictor, max_batch_size, max_wait_ms)
+    server = ScoringServer((host, port), make_handler(batcher))
+    logger.info(f"Serving predictions on http://{host}:{port}/predict")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Score feature rows with the points per game model")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    batch = commands.add_parser('batch', help="score a CSV or Parquet file of feature rows")
+    batch.add_argument('input', help="CSV or .parquet file with the model's feature columns")
+    batch.add_argument('output', help="CSV or .parquet file to write with predictions")
+    batch.add_argument('--chunk-size', type=int, default=50000, help="rows scored per predict call")
+
+    service = commands.add_parser('serve', help="run the local micro-batching scoring service")
+    service.add_argument('--host', default=os.getenv('SCORING_HOST', '127.0.0.1'))
+    service.add_argument('--port', type=int, default=int(os.getenv('SCORING_PORT', '8600')))
+    service.add_argument('--max-batch-size', type=int, default=256, help="most rows per predict call")
+    service.add_argument('--max-wait-ms', type=float, default=5,
+                         help="longest a request waits for others to join its batch")
+    args = parser.parse_args()
+
+    predictor = load_predictor()
+    if args.command == 'batch':
+        rows = score_file(predictor, args.input, args.output, args.chunk_size)
+        logger.info(f"Wrote {rows} predictions to {args.output}")
+    else:
+        serve(predictor, args.host, args.port, args.max_batch_size, args.max_wait_ms)
+
+if __name__ == "__main__":
+    main()
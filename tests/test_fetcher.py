@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from fetcher import CircuitBreaker, CircuitOpenError, FetchError, Fetcher
+
+class StubResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.headers = {}
+
+class StubSession:
+    """Answer each GET with the next queued status code"""
+
+    def __init__(self, *status_codes: int):
+        self.status_codes = list(status_codes)
+
+    def get(self, url, headers=None, timeout=None):
+        return StubResponse(self.status_codes.pop(0))
+
+def test_throttled_half_open_probe_admits_a_new_probe_after_the_next_cool_down():
+    session = StubSession(500, 429, 200)
+    fetcher = Fetcher(session, max_retries=0, backoff_base=0)
+    fetcher.throttle('example.com').breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    url = 'http://example.com/teams/LAL/2024.html'
+
+    with pytest.raises(FetchError):
+        fetcher.get(url)
+    with pytest.raises(CircuitOpenError):
+        fetcher.get(url)
+
+    # The half-open probe is throttled, which is neither a success nor a failure
+    time.sleep(0.06)
+    with pytest.raises(FetchError):
+        fetcher.get(url)
+    with pytest.raises(CircuitOpenError):
+        fetcher.get(url)
+
+    time.sleep(0.06)
+    assert fetcher.get(url).status_code == 200